@@ -0,0 +1,198 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from deck import DEFAULT_PENETRATION
+from parallel import shard_seeds, shard_sizes
+from rng import DEFAULT_GENERATOR
+from simulation import HeadlessBlackjack, Policy, CountingBetPolicy
+
+# Constants
+DEFAULT_SESSIONS = 1000
+DEFAULT_MAX_ROUNDS = 10000  # A session that survives this long counts as not ruined
+DEFAULT_SHARD_SESSIONS = 100
+RUIN_BUCKETS = 64  # Time-to-ruin histogram buckets: bucket k counts ruins in rounds [2 ** (k - 1), 2 ** k)
+SESSION_PLAYER = "Player"
+
+
+class RunningMoments:
+    # Count, mean, variance and range of a stream in constant memory (Welford's algorithm).
+    # merge combines two streams exactly, so shards can be summarised independently.
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared distances from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        # Sample variance
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class SessionStats:
+    # Streaming summary of many sessions played with one bet policy. Nothing grows with the
+    # number of rounds or sessions: trajectories are reduced to these estimators as they are played.
+    def __init__(self, name, initial_balance, max_rounds):
+        self.name = name
+        self.initial_balance = initial_balance
+        self.max_rounds = max_rounds
+        self.sessions = 0
+        self.ruined = 0
+        self.ruin_histogram = [0] * RUIN_BUCKETS
+        self.time_to_ruin = RunningMoments()  # Rounds played by ruined sessions
+        self.max_drawdown = RunningMoments()  # Largest fall from a running peak, per session
+        self.final_balance = RunningMoments()
+        self.round_net = RunningMoments()  # Net result of every round the seat bet on
+
+    def record_session(self, rounds, ruined, max_drawdown, final_balance):
+        self.sessions += 1
+        if ruined:
+            self.ruined += 1
+            self.ruin_histogram[min(rounds.bit_length(), RUIN_BUCKETS - 1)] += 1
+            self.time_to_ruin.add(rounds)
+        self.max_drawdown.add(max_drawdown)
+        self.final_balance.add(final_balance)
+
+    def merge(self, other):
+        self.sessions += other.sessions
+        self.ruined += other.ruined
+        self.ruin_histogram = [count + other_count for count, other_count in zip(self.ruin_histogram, other.ruin_histogram)]
+        self.time_to_ruin.merge(other.time_to_ruin)
+        self.max_drawdown.merge(other.max_drawdown)
+        self.final_balance.merge(other.final_balance)
+        self.round_net.merge(other.round_net)
+        return self
+
+    @property
+    def risk_of_ruin(self):
+        return self.ruined / self.sessions if self.sessions else 0.0
+
+    @property
+    def risk_of_ruin_error(self):
+        # Standard error of the risk of ruin estimate
+        if not self.sessions:
+            return 0.0
+        return math.sqrt(self.risk_of_ruin * (1 - self.risk_of_ruin) / self.sessions)
+
+    def ruin_by(self, rounds):
+        # Share of sessions ruined within `rounds` rounds, at the resolution of the histogram
+        # (rounds is rounded down to a power of two minus one)
+        if not self.sessions:
+            return 0.0
+        return sum(self.ruin_histogram[:(rounds + 1).bit_length()]) / self.sessions
+
+    def ruin_distribution(self):
+        # (first round, last round, sessions ruined) for every non-empty histogram bucket
+        return [
+            (1 << bucket >> 1, (1 << bucket) - 1, count)
+            for bucket, count in enumerate(self.ruin_histogram) if count
+        ]
+
+    def summary(self):
+        lines = [
+            f"{self.name}: {self.sessions} sessions of up to {self.max_rounds} rounds from {self.initial_balance}",
+            f"  risk of ruin {self.risk_of_ruin:.4f} ± {self.risk_of_ruin_error:.4f}, "
+            f"mean time to ruin {self.time_to_ruin.mean:.1f} rounds",
+            f"  max drawdown mean {self.max_drawdown.mean:.1f} / worst {self.max_drawdown.max:g}, "
+            f"final balance mean {self.final_balance.mean:.1f} ± {self.final_balance.std:.1f}",
+            f"  per round: mean {self.round_net.mean:+.5f}, variance {self.round_net.variance:.4f}",
+        ]
+        for first, last, count in self.ruin_distribution():
+            lines.append(f"  ruined in rounds {first}-{last}: {count}")
+        return "\n".join(lines)
+
+
+def play_session(game, stats, max_rounds):
+    # Play one seat until it is ruined or max_rounds have been played, tracking the running peak
+    # and drawdown of its balance instead of storing the trajectory
+    player = game.players[0]
+    round_net = stats.round_net
+    peak = player.balance
+    max_drawdown = 0
+    rounds = 0
+    while rounds < max_rounds:
+        outcome = game.play_headless_round()
+        if outcome is None:
+            break
+        rounds += 1
+        if player in outcome:  # Seats that skip a round have no result
+            round_net.add(outcome[player][1])
+        balance = player.balance
+        if balance > peak:
+            peak = balance
+        elif peak - balance > max_drawdown:
+            max_drawdown = peak - balance
+        if not game.has_funds(player):
+            break
+    stats.record_session(rounds, not game.has_funds(player), max_drawdown, player.balance)
+
+
+def run_sessions(task):
+    name, policy, initial_balance, sessions, max_rounds, seed, num_decks, penetration, rules, generator = task
+    stats = SessionStats(name, initial_balance, max_rounds)
+    for session_seed in shard_seeds(seed, sessions):
+        game = HeadlessBlackjack([SESSION_PLAYER], initial_balance, policy, session_seed, num_decks, penetration,
+                                 rules=rules, generator=generator)
+        play_session(game, stats, max_rounds)
+    return stats
+
+
+def analyze(policies, initial_balance, sessions=DEFAULT_SESSIONS, max_rounds=DEFAULT_MAX_ROUNDS, seed=0,
+            workers=None, shard_sessions=DEFAULT_SHARD_SESSIONS, num_decks=1, penetration=DEFAULT_PENETRATION,
+            rules=None, generator=DEFAULT_GENERATOR):
+    # Play `sessions` independent single-seat sessions for every bet policy in policies (name -> Policy)
+    # and return {name: SessionStats}. Sessions are spread over a process pool in fixed shards and
+    # merged in order, so a seed gives the same result for any number of workers.
+    sizes = shard_sizes(sessions, shard_sessions)
+    tasks = [
+        (name, policy, initial_balance, size, max_rounds, shard_seed, num_decks, penetration, rules, generator)
+        for name, policy in policies.items()
+        for size, shard_seed in zip(sizes, shard_seeds(seed, len(sizes)))
+    ]
+    results = {name: SessionStats(name, initial_balance, max_rounds) for name in policies}
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        for stats in map(run_sessions, tasks):
+            results[stats.name].merge(stats)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            for stats in pool.map(run_sessions, tasks):
+                results[stats.name].merge(stats)
+
+    return results
+
+
+if __name__ == "__main__":
+    results = analyze({"flat": Policy(), "hi-lo": CountingBetPolicy(Policy())}, 100, sessions=200, max_rounds=5000)
+    print("\n".join(stats.summary() for stats in results.values()))
@@ -0,0 +1,131 @@
+from blackjack import HIT_ACTION
+from deck import DEFAULT_PENETRATION
+from rng import DEFAULT_GENERATOR
+from simulation import HeadlessBlackjack, Policy
+
+
+class BatchPolicy:
+    # Decides for many automated seats in one call. Every method receives a list of
+    # (game, player, hand_index) seats, possibly from several tables, and returns one decision
+    # per seat in the same order. The defaults ask a per-seat Policy for each seat in turn;
+    # subclasses override them to score a whole batch at once (a model, a lookup table...).
+    def __init__(self, policy=None):
+        self.policy = policy or Policy()
+
+    def bets(self, seats):
+        return [self.policy.bet(game, player) for game, player, _ in seats]
+
+    def surrenders(self, seats):
+        return [self.policy.surrender(game, player) for game, player, _ in seats]
+
+    def splits(self, seats):
+        return [self.policy.split(game, player, hand_index) for game, player, hand_index in seats]
+
+    def doubles(self, seats):
+        return [self.policy.double_down(game, player, hand_index) for game, player, hand_index in seats]
+
+    def actions(self, seats):
+        return [self.policy.action(game, player, hand_index) for game, player, hand_index in seats]
+
+
+class BatchBlackjack(HeadlessBlackjack):
+    # Headless table whose seats are all driven by one BatchPolicy. Rounds are played in phases
+    # (bets, surrenders, splits, doubles, then hit/stand passes over every open hand) so each
+    # decision point is a single call. Cards are dealt in phase order rather than seat by seat,
+    # which changes which seat gets which card but not the odds.
+    def __init__(self, player_names, initial_balance, batch_policy, seed=None,
+                 num_decks=1, penetration=DEFAULT_PENETRATION, event_log=None, store=None, rules=None,
+                 generator=DEFAULT_GENERATOR):
+        super().__init__(player_names, initial_balance, {}, seed, num_decks, penetration,
+                         event_log=event_log, store=store, rules=rules, generator=generator)
+        self.batch_policy = batch_policy
+        self.pending_bets = {}  # Filled by the bets phase and read back by handle_bets
+
+    def ask_for_bet(self, player):
+        return self.rules.table_bet(self.pending_bets.pop(player, 0), player.balance)
+
+    def play_headless_round(self):
+        return play_batched_round([self], self.batch_policy)[0]
+
+
+def decide(method, seats):
+    # Skip the call entirely when no seat is at this decision point
+    return method(seats) if seats else []
+
+
+def play_batched_round(games, batch_policy):
+    # Play one round on every BatchBlackjack in games, asking batch_policy once per decision point
+    # for all of their seats together. Returns each game's {player: (wagered, net)}, or None for
+    # games where nobody has funds left.
+    started = [game for game in games if game.start_headless_round()]
+
+    seats = [(game, player, 0) for game in started for player in game.players if game.has_funds(player)]
+    for (game, player, _), amount in zip(seats, decide(batch_policy.bets, seats)):
+        game.pending_bets[player] = amount
+    playing = [game for game in started if game.handle_bets()]
+    for game in playing:
+        game.deal_initial_cards()
+
+    # Options on the first two cards, one batch each
+    seats = [(game, player, 0) for game in playing for player in game.active_players if game.rules.can_surrender(player)]
+    for (game, player, _), surrender in zip(seats, decide(batch_policy.surrenders, seats)):
+        if surrender:
+            game.handle_surrender(player)
+
+    seats = [(game, player, 0) for game in playing for player in game.active_players
+             if not player.surrendered and game.rules.can_split(player)]
+    for (game, player, _), split in zip(seats, decide(batch_policy.splits, seats)):
+        if split:
+            game.handle_split(player)
+
+    seats = [(game, player, 0) for game in playing for player in game.active_players
+             if not player.surrendered and len(player.hands) == 1 and game.rules.can_double_down(player)]
+    doubled = set()
+    for (game, player, _), double in zip(seats, decide(batch_policy.doubles, seats)):
+        if double:
+            game.handle_double_down(player)
+            doubled.add(player)
+
+    # Hit/stand passes: every open hand of every table decides together until all are finished
+    hands = [(game, player, hand_index) for game in playing for player in game.active_players
+             if not player.surrendered and player not in doubled for hand_index in range(len(player.hands))]
+    while hands:
+        hands = [seat for seat in hands if not seat[0].is_turn_over(seat[1], seat[2])]
+        if not hands:
+            break
+        hands = split_hand_options(hands, batch_policy)
+        still_open = []
+        for seat, action in zip(hands, decide(batch_policy.actions, hands)):
+            game, player, hand_index = seat
+            if action == HIT_ACTION:
+                game.handle_hit(player, hand_index)
+                still_open.append(seat)
+            else:
+                game.handle_stand(player, hand_index)
+        hands = still_open
+
+    for game in playing:
+        game.host_turn()
+        game.finish_play()
+    outcomes = {game: game.finish_headless_round() for game in started}
+    return [outcomes.get(game) for game in games]
+
+
+def split_hand_options(hands, batch_policy):
+    # Offer resplits and doubles to split hands that just received their second card, when the
+    # table's rules allow them. Returns the hands that still need a hit/stand decision.
+    offered = [seat for seat in hands if seat[0].rules.split_hand_options and len(seat[1].hands) > 1
+               and len(seat[1].get_hand(seat[2])) == 2]
+    if not offered:
+        return hands
+
+    seats = [seat for seat in offered if seat[0].rules.can_split(seat[1], seat[2])]
+    for game, player, hand_index in [seat for seat, split in zip(seats, decide(batch_policy.splits, seats)) if split]:
+        game.handle_split(player, hand_index)
+        hands.append((game, player, len(player.hands) - 1))
+
+    seats = [seat for seat in offered if len(seat[1].get_hand(seat[2])) == 2 and seat[0].rules.can_double_down(seat[1], seat[2])]
+    doubled = [seat for seat, double in zip(seats, decide(batch_policy.doubles, seats)) if double]
+    for game, player, hand_index in doubled:
+        game.handle_double_down(player, hand_index)
+    return [seat for seat in hands if seat not in doubled]
@@ -0,0 +1,185 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from deck import Card, Deck
+from host import Host
+from player import Player
+from simulation import HeadlessBlackjack, Policy
+
+# Constants
+DEFAULT_ITERATIONS = 20000
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2  # Fail when throughput drops by more than 20%
+DEFAULT_BASELINE = "bench_baseline.json"
+ROUND_PLAYERS = range(1, 7)
+ALLOCATION_ROUNDS = 200
+BENCH_BALANCE = 10 ** 12
+
+
+def bench_reinitialize_deck():
+    deck = Deck(1)
+    return deck.reinitialize_deck, 1
+
+
+def bench_shuffle():
+    deck = Deck(1)
+    return deck.shuffle, 1
+
+
+def bench_deal():
+    deck = Deck(1)
+
+    def deal():
+        if deck.is_empty():
+            deck.reinitialize_deck()
+        deck.deal()
+    return deal, 1
+
+
+def bench_hand_value():
+    player = Player("Bench", 0)
+    player.receive_hand(Card("♠", "A"), Card("♥", "7"))
+    player.hit(Card("♦", "K"))
+    return player.calculate_hand_value, 1
+
+
+def bench_split():
+    player = Player("Bench", 0)
+    pair = (Card("♠", "8"), Card("♥", "8"))
+
+    def split():
+        player.reset_hand()
+        player.reset_bet()
+        player.receive_hand(*pair)
+        player.split()
+    return split, 1
+
+
+def bench_must_hit():
+    host = Host()
+    host.receive_hand(Card("♠", "10"), Card("♥", "6"))
+    return host.must_hit, 1
+
+
+def round_game(num_players):
+    names = [f"Player {seat + 1}" for seat in range(num_players)]
+    return HeadlessBlackjack(names, BENCH_BALANCE, Policy(), seed=num_players)
+
+
+def bench_rounds(num_players):
+    def setup():
+        return round_game(num_players).play_headless_round, num_players  # One hand per player per round
+    return setup
+
+
+BENCHMARKS = {
+    "deck.reinitialize_deck": bench_reinitialize_deck,
+    "deck.shuffle": bench_shuffle,
+    "deck.deal": bench_deal,
+    "player.calculate_hand_value": bench_hand_value,
+    "player.split": bench_split,
+    "host.must_hit": bench_must_hit,
+}
+BENCHMARKS.update({f"round.{num_players}_players": bench_rounds(num_players) for num_players in ROUND_PLAYERS})
+
+
+def measure_throughput(function, operations_per_call, iterations, repeat):
+    # Best-of-repeat operations per second
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return iterations * operations_per_call / best
+
+
+def measure_allocations(num_players, rounds=ALLOCATION_ROUNDS):
+    # Average bytes allocated at the peak of a round, traced with tracemalloc
+    game = round_game(num_players)
+    game.play_headless_round()  # Warm up caches before tracing
+    tracemalloc.start()
+    total = 0
+    for _ in range(rounds):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        game.play_headless_round()
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / rounds
+
+
+def run_benchmarks(names=None, iterations=DEFAULT_ITERATIONS, repeat=DEFAULT_REPEAT):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        function, operations_per_call = setup()
+        # Full rounds are far slower than single calls, so run fewer of them
+        round_iterations = max(1, iterations // 10) if name.startswith("round.") else iterations
+        results[name] = {"ops_per_sec": measure_throughput(function, operations_per_call, round_iterations, repeat)}
+        if name.startswith("round."):
+            results[name]["alloc_bytes_per_round"] = measure_allocations(operations_per_call)
+    return results
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    # Return (name, baseline ops/s, current ops/s) for every benchmark slower than the threshold allows
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["ops_per_sec"]
+        if result["ops_per_sec"] < expected * (1 - threshold):
+            regressions.append((name, expected, result["ops_per_sec"]))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = []
+    for name, result in results.items():
+        line = f"{name:32} {result['ops_per_sec']:>14,.0f} ops/s"
+        if "alloc_bytes_per_round" in result:
+            line += f" {result['alloc_bytes_per_round']:>10,.0f} B/round"
+        if baseline and name in baseline:
+            change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+            line += f" ({change:+.1%} vs baseline)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Blackjack hot paths.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON baseline to compare against")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown fraction")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names, args.iterations, args.repeat)
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = None
+
+    print(format_results(results, baseline))
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline or {}, args.threshold)
+    for name, expected, actual in regressions:
+        print(f"REGRESSION {name}: {actual:,.0f} ops/s, baseline {expected:,.0f} ops/s")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
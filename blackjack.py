@@ -1,6 +1,9 @@
-from deck import Deck
+from deck import Deck, DEFAULT_PENETRATION
+from rng import DEFAULT_GENERATOR
 from player import Player
 from host import Host
+from renderer import TerminalRenderer
+from rules import BLACKJACK, LOSS, PUSH, SURRENDER, WIN, CompiledRules, Rules
 
 # Constants
 WELCOME_MESSAGE = "Welcome to Blackjack!"
@@ -11,50 +14,82 @@ NO_ACTIVE_PLAYERS_MESSAGE = "No active players for this round.\n"
 SKIP_ROUND_MESSAGE = "{} is skipping this round.\n"
 INSUFFICIENT_FUNDS_MESSAGE = "{} cannot play due to insufficient funds.\n"
 NEW_DECK_MESSAGE = "New deck is being used"
+SHUFFLE_MESSAGE = "Cut card reached, shuffling the shoe..."
 INVALID_OPTION_MESSAGE = "Invalid option. Please enter 'h' for hit or 's' for stand."
 INVALID_ANSWER_MESSAGE ="Please answer with 'yes' or 'no'."
 INVALID_BET_MESSAGE = "Invalid bet. Please enter a number between 0 and {}."
+INVALID_BET_UNIT_MESSAGE = "Invalid bet. Bets at this table must be multiples of {}."
 INVALID_INPUT_MESSAGE = "Invalid input. Please enter a number."
 EXIT_DUE_TO_FUNDS_MESSAGE = "{} has exited the game due to insufficient funds.\n"
 PLAYER_BUSTS_MESSAGE = "{} busts! {} wins."
 PLAYER_WINS_MESSAGE = "{} wins!"
 TIE_MESSAGE = "{} and {} tie!"
+BLACKJACK_MESSAGE = "{} has Blackjack!"
+SURRENDER_MESSAGE = "{} surrendered and gets half the bet back."
 PLAYER_BALANCE_MESSAGE = "{}'s balance: ${}"
 HOST_HAND_MESSAGE = "{}'s hand: {} ?"
+HAND_MESSAGE = "{name}'s hand: {hand}"
+HOST_REVEAL_MESSAGE = "Host reveals hand: {hand}"
+ROUND_MESSAGE = "Round {}:"
+ROUND_END_MESSAGE = "Round End:"
+PLAYING_HAND_MESSAGE = "Playing hand {} for {}"
+DOUBLE_DOWN_MESSAGE = "{} has doubled down. New bet: ${}"
+SPLIT_MESSAGE = "{} has split."
+SURRENDERED_MESSAGE = "{} has surrendered."
+HINT_MESSAGE = "Hint: basic strategy says {}."
 HIT_ACTION = "h"
 STAND_ACTION = "s"
 SEPARATOR = "-" * 40
+OUTCOME_MESSAGES = {
+    LOSS: PLAYER_BUSTS_MESSAGE,
+    PUSH: TIE_MESSAGE,
+    WIN: PLAYER_WINS_MESSAGE,
+    BLACKJACK: BLACKJACK_MESSAGE,
+    SURRENDER: SURRENDER_MESSAGE,
+}
 
 class Blackjack:
-    def __init__(self, player_names, initial_balance):
-        self.players = [Player(name, initial_balance) for name in player_names]
-        self.host = Host()
-        self.deck = Deck()
+    def __init__(self, player_names, initial_balance, output=print, seed=None,
+                 num_decks=1, penetration=DEFAULT_PENETRATION, strategy=None, event_log=None, store=None, rules=None,
+                 generator=DEFAULT_GENERATOR, renderer=None):
+        # Table rules are compiled once; num_decks only applies when no Rules are given
+        self.rules = CompiledRules(rules or Rules(num_decks=num_decks))
+        # Resume known players from the store; new players start at initial_balance
+        balances = store.load_balances(player_names, initial_balance) if store is not None else {}
+        self.players = [Player(name, balances.get(name, initial_balance)) for name in player_names]
+        self.host = Host(self.rules.host_hit_table)
+        self.deck = Deck(seed, self.rules.num_decks, penetration, generator)
         self.active_players = []
         self.round_number = 0
+        # Every message goes through the renderer; by default it prints each one with `output`
+        self.renderer = renderer or TerminalRenderer(output)
+        self.strategy = strategy  # Optional StrategyTable used to print hints
+        self.event_log = event_log  # Optional EventLogWriter recording every round
+        self.store = store  # Optional BankrollStore persisting balances and round history
+        if event_log is not None:
+            # Seats resumed from the store do not start at initial_balance, so every starting balance is logged
+            for player in self.players:
+                event_log.starting_balance(player)
 
     def start_game(self):
         self.print_welcome_message()
-        print(SEPARATOR)
-        print("\n")
+        self.renderer.message(SEPARATOR)
+        self.renderer.message("\n")
         
         while self.any_player_with_funds():
             self.round_number += 1
-            print(f"Round {self.round_number}:")
+            self.renderer.message(ROUND_MESSAGE, self.round_number)
 
-            # Create a new list for eligible players (those with funds)
-            eligible_players = []
             for player in self.players:
-                if player.balance > 0:
-                    print(PLAYER_BALANCE_MESSAGE.format(player.name, player.balance))
-                    eligible_players.append(player)
+                if self.has_funds(player):
+                    self.renderer.message(PLAYER_BALANCE_MESSAGE, player.name, player.balance)
                 else:
-                    print(EXIT_DUE_TO_FUNDS_MESSAGE.format(player.name))
+                    self.renderer.message(EXIT_DUE_TO_FUNDS_MESSAGE, player.name)
             
-            print(SEPARATOR)
+            self.renderer.message(SEPARATOR)
             
-            # Update the list of players with those who are eligible
-            self.players = eligible_players
+            # Drop players without funds (the list is only rebuilt when somebody leaves)
+            self.remove_players_without_funds()
 
             # If no eligible players remain, break the loop
             if not self.players:
@@ -66,70 +101,102 @@ class Blackjack:
                 self.deal_initial_cards()
                 self.play_round()
                 self.print_results()
+                if self.store is not None:
+                    self.store.record_round(self)
+            self.renderer.end_round()
+
+        self.renderer.message(GAME_OVER_NO_FUNDS_MESSAGE)
+        self.renderer.flush()
+        if self.event_log is not None:
+            self.event_log.flush()
+        if self.store is not None:
+            self.store.flush()
 
-        print(GAME_OVER_NO_FUNDS_MESSAGE)
+    def has_funds(self, player):
+        # Enough left for the smallest bet the table pays exactly (any positive balance by default)
+        return player.balance >= self.rules.bet_unit
+
+    def remove_players_without_funds(self):
+        if not all(self.has_funds(player) for player in self.players):
+            self.players = [player for player in self.players if self.has_funds(player)]
 
     def any_player_with_funds(self):
-        return any(player.balance > 0 for player in self.players)
+        return any(self.has_funds(player) for player in self.players)
 
     def print_welcome_message(self):
-        print(WELCOME_MESSAGE)
+        self.renderer.message(WELCOME_MESSAGE)
 
     def print_insufficient_funds_message(self):
-        print(GAME_OVER_NO_FUNDS_MESSAGE)
+        self.renderer.message(GAME_OVER_NO_FUNDS_MESSAGE)
     
     def handle_bets(self):
-        self.active_players = []  # Reset the list of active players for the new round
-        for player in self.players[:]:  # Iterate over a copy of self.players
-            if player.balance > 0:
+        self.active_players.clear()  # Reuse the list of active players for the new round
+        for player in self.players:  # ask_for_bet is only called for players with funds, so nobody is removed
+            if self.has_funds(player):
                 bet = self.ask_for_bet(player)
                 if bet > 0:
                     player.place_bet(bet)
+                    if self.event_log is not None:
+                        self.event_log.bet(player, bet)
                     self.active_players.append(player)
                 else:
-                    print(SKIP_ROUND_MESSAGE.format(player.name))
+                    self.renderer.message(SKIP_ROUND_MESSAGE, player.name)
             else:
-                print(INSUFFICIENT_FUNDS_MESSAGE.format(player.name))
+                self.renderer.message(INSUFFICIENT_FUNDS_MESSAGE, player.name)
 
         if not self.active_players:
-            print(NO_ACTIVE_PLAYERS_MESSAGE)
+            self.renderer.message(NO_ACTIVE_PLAYERS_MESSAGE)
             return  False 
         
         return True
     
     def deal_initial_cards(self):
-        print(DEAL_CARDS_MESSAGE)
+        self.renderer.message(DEAL_CARDS_MESSAGE)
         for player in self.active_players:
-            card_1, card_2 = self.deck.deal()
+            card_1, card_2 = self.deal_cards()
             player.receive_hand(card_1, card_2)
+            if self.event_log is not None:
+                self.event_log.deal(player, card_1, card_2)
 
         # Deal to the host last
-        host_card_1, host_card_2 = self.deck.deal()
+        host_card_1, host_card_2 = self.deal_cards()
         self.host.receive_hand(host_card_1, host_card_2)
+        if self.event_log is not None:
+            self.event_log.deal(self.host, host_card_1, host_card_2)
 
         # At this point, all active players and the host have been dealt hands for the round
         self.print_hands()
     
     def reset_for_new_round(self):
+        if self.event_log is not None:
+            self.event_log.round_start(self.round_number)
+
         for player in self.players:
             player.reset_hand()  
             player.reset_bet()   
 
-        self.host.reset_hand()  
-        self.deck.shuffle()
+        self.host.reset_hand()
+
+        # Only reshuffle between rounds once the cut card has come out
+        if self.deck.needs_shuffle():
+            self.renderer.message(SHUFFLE_MESSAGE)
+            self.deck.shuffle()
 
     def play_round(self):
+        rules = self.rules
         # Players' turns
         for player in self.active_players:
-            # Check and offer double down
-            if player.can_split() and self.offer_split(player):
-                for hand_index in range(len(player.hands)):
-                    print(f"Playing hand {hand_index + 1} for {player.name}")
-                    self.play_hand(player, hand_index)
+            # Offer surrender first when the table allows it; it ends the player's turn
+            if rules.can_surrender(player) and self.offer_surrender(player):
+                continue
+
+            # Check and offer split
+            if rules.can_split(player) and self.offer_split(player):
+                self.play_split_hands(player)
                 continue  # Move to the next player after handling split hands
 
             # Offer double down if possible and no split was done
-            if  player.can_double_down() and self.offer_double_down(player):
+            if rules.can_double_down(player) and self.offer_double_down(player):
                 continue # Double down ends the player's turn
         
             # Regular play if no split or double down
@@ -137,139 +204,213 @@ class Blackjack:
 
         self.host_turn()
 
+    def play_split_hands(self, player):
+        # Resplits append new hands, so keep going until every hand has been played
+        hand_index = 0
+        while hand_index < len(player.hands):
+            self.renderer.message(PLAYING_HAND_MESSAGE, hand_index + 1, player.name)
+            self.play_hand(player, hand_index)
+            hand_index += 1
+
     def play_hand(self, player, hand_index=0):
         while not self.is_turn_over(player, hand_index):
-            action = self.get_player_action(player)
+            if self.rules.split_hand_options and len(player.hands) > 1 and self.offer_split_hand_options(player, hand_index):
+                break  # Doubled down on a split hand
+            action = self.get_player_action(player, hand_index)
             if action == HIT_ACTION:
                 self.handle_hit(player, hand_index)
             elif action == STAND_ACTION:
                 self.handle_stand(player, hand_index)
                 break
 
-    def offer_double_down(self, player):
+    def offer_split_hand_options(self, player, hand_index):
+        # Split hands start from one card, so resplits and doubles are offered once the second card is in.
+        # Returns True when the hand was doubled down, which ends its turn.
+        if len(player.get_hand(hand_index)) != 2:
+            return False
+        if self.rules.can_split(player, hand_index) and self.offer_split(player, hand_index):
+            return False
+        return self.rules.can_double_down(player, hand_index) and self.offer_double_down(player, hand_index)
+
+    def offer_surrender(self, player):
+        while True:
+            try:
+                response = self.ask(f"{player.name}, do you want to Surrender? (yes/no): ").strip().lower()
+                if response not in ["yes", "no"]:
+                    raise ValueError(INVALID_ANSWER_MESSAGE)
+
+                if response == "yes":
+                    self.handle_surrender(player)
+                    return True
+
+                if response == "no":
+                    return False
+
+            except ValueError as e:
+                self.renderer.message("{}", e)
+
+    def offer_double_down(self, player, hand_index=0):
         while True:
             try:
-                response = input(f"{player.name}, do you want to Double Down? (yes/no): ").strip().lower()
+                response = self.ask(f"{player.name}, do you want to Double Down? (yes/no): ").strip().lower()
                 if response not in ["yes", "no"]:
                     raise ValueError(INVALID_ANSWER_MESSAGE)
 
                 if response == "yes":
-                    player.double_down()
-                    print(f"{player.name} has doubled down. New bet: ${player.bets[0]}")
-                    self.handle_hit(player)
+                    self.handle_double_down(player, hand_index)
                     return True
 
                 if response == "no":
                     return False
 
             except ValueError as e:
-                print(e)
+                self.renderer.message("{}", e)
 
-    def offer_split(self, player):
+    def offer_split(self, player, hand_index=0):
         while True:
             try:
-                response = input(f"{player.name}, Do you want to Split? (yes/no): ").strip().lower()
+                response = self.ask(f"{player.name}, Do you want to Split? (yes/no): ").strip().lower()
                 if response not in ["yes", "no"]:
                     raise ValueError(INVALID_ANSWER_MESSAGE)
             
                 if response == "yes":
-                    player.split()
-                    print(f"{player.name} has split.")
+                    self.handle_split(player, hand_index)
                     return True
                 
                 if response == "no":
                     return False
                 
             except ValueError as e:
-                print(e)
+                self.renderer.message("{}", e)
+
+    def handle_double_down(self, player, hand_index=0):
+        player.double_down(hand_index)
+        if self.event_log is not None:
+            self.event_log.double(player, hand_index)
+        self.renderer.message(DOUBLE_DOWN_MESSAGE, player.name, player.bets[hand_index])
+        self.handle_hit(player, hand_index)
+
+    def handle_split(self, player, hand_index=0):
+        player.split(hand_index)
+        if self.event_log is not None:
+            self.event_log.split(player, hand_index)
+        self.renderer.message(SPLIT_MESSAGE, player.name)
+
+    def handle_surrender(self, player):
+        player.surrender()
+        if self.event_log is not None:
+            self.event_log.surrender(player)
+        self.renderer.message(SURRENDERED_MESSAGE, player.name)
+
+    def get_player_action(self, player, hand_index=0):
+        if self.strategy is not None:
+            hint = self.strategy.hint(player.get_hand(hand_index), self.host_upcard().value)
+            self.renderer.message(HINT_MESSAGE, hint)
 
-    def get_player_action(self, player):
         while True:
-            action = input(f"{player.name}, do you want to hit ({HIT_ACTION}) or stand ({STAND_ACTION})?: ").lower()
+            action = self.ask(f"{player.name}, do you want to hit ({HIT_ACTION}) or stand ({STAND_ACTION})?: ").lower()
             if action in [HIT_ACTION, STAND_ACTION]:
                 return action
-            print(INVALID_OPTION_MESSAGE)
+            self.renderer.message(INVALID_OPTION_MESSAGE)
 
     def handle_hit(self, player, hand_index=0):
-            print(DRAW_CARD_MESSAGE)
-            print("\n")
+            self.renderer.message(DRAW_CARD_MESSAGE)
+            self.renderer.message("\n")
             new_card = self.hit_card()
             player.hit(new_card, hand_index)
-            print(f"{player.name}'s hand: {player.print_hand(hand_index)}")
-            print("\n")
+            if self.event_log is not None:
+                self.event_log.hit(player, hand_index, new_card)
+            self.renderer.hand(player, HAND_MESSAGE, hand_index)
+            self.renderer.message("\n")
     
     def handle_stand(self, player, hand_index=0):
-        print(f"{player.name}'s hand: {player.print_hand(hand_index)}")
-        print("\n")
+        if self.event_log is not None:
+            self.event_log.stand(player, hand_index)
+        self.renderer.hand(player, HAND_MESSAGE, hand_index)
+        self.renderer.message("\n")
 
     def host_turn(self):
         while self.host.must_hit():
-            new_card = self.deck.hit()
+            new_card = self.hit_card()
             self.host.hit(new_card)
+            if self.event_log is not None:
+                self.event_log.host_draw(new_card)
 
     def ask_for_bet(self, player):
-        if player.balance == 0:
-            print(EXIT_DUE_TO_FUNDS_MESSAGE.format(player.name))
+        if not self.has_funds(player):
+            self.renderer.message(EXIT_DUE_TO_FUNDS_MESSAGE, player.name)
             self.players.remove(player)
             return None
     
         while True:
             try:
-                bet = int(input(f"{player.name}, how much do you want to bet? (0 to exit): "))
-                print("\n")
-                if 0 <= bet <= player.balance:
+                bet = int(self.ask(f"{player.name}, how much do you want to bet? (0 to exit): "))
+                self.renderer.message("\n")
+                if bet % self.rules.bet_unit:
+                    self.renderer.message(INVALID_BET_UNIT_MESSAGE, self.rules.bet_unit)
+                elif 0 <= bet <= player.balance:
                     return bet
                 else:
-                    print(INVALID_BET_MESSAGE.format(player.balance))
+                    self.renderer.message(INVALID_BET_MESSAGE, player.balance)
             except ValueError:
-                print(INVALID_INPUT_MESSAGE)
+                self.renderer.message(INVALID_INPUT_MESSAGE)
+
+    def ask(self, prompt):
+        # Show anything the renderer is holding back before waiting for the player
+        self.renderer.flush()
+        return input(prompt)
 
     def hit_card(self):
         if self.deck.is_empty():
-            print(NEW_DECK_MESSAGE)
+            self.renderer.message(NEW_DECK_MESSAGE)
             self.deck.reinitialize_deck()
         
         return self.deck.hit()
 
+    def deal_cards(self):
+        if self.deck.is_empty():
+            self.renderer.message(NEW_DECK_MESSAGE)
+            self.deck.reinitialize_deck()
+
+        return self.deck.deal()
+
+    def host_upcard(self):
+        return self.host.get_hand(0)[0]
+
     def print_hands(self, hidden=True):
         for player in self.players:
-            print(f"{player.name}'s hand: {player.print_hand()}")
+            self.renderer.hand(player, HAND_MESSAGE)
         
         if hidden:
-            print(HOST_HAND_MESSAGE.format(self.host.name, self.host.hands[0][0][1] + self.host.hands[0][0][0]), end="")
+            upcard = self.host_upcard()
+            self.renderer.message(HOST_HAND_MESSAGE, self.host.name, upcard.rank + upcard.suit, end="")
         else:
-            print(f"Host reveals hand: {self.host.print_hand()}")
+            self.renderer.hand(self.host, HOST_REVEAL_MESSAGE)
         
-        print("\n")
+        self.renderer.message("\n")
 
     def update_balances(self):
+        # Settle every hand of every player, split hands included, against the host
+        rules = self.rules
         host_value = self.host.calculate_hand_value()
+        host_natural = rules.host_checks_natural and rules.is_natural(self.host)
 
         for player in self.players:
-            player_value = player.calculate_hand_value()
-            if player_value > 21:
-                print(PLAYER_BUSTS_MESSAGE.format(player.name, self.host.name))
-            elif host_value > 21:
-                print(PLAYER_WINS_MESSAGE.format(player.name))
-                player.balance += player.bets[0] * 2
-            elif player_value > host_value:
-                print(PLAYER_WINS_MESSAGE.format(player.name))
-                player.balance += player.bets[0] * 2
-            elif player_value < host_value:
-                print(PLAYER_BUSTS_MESSAGE.format(player.name, self.host.name))
-            else:
-                print(TIE_MESSAGE.format(player.name, self.host.name))
-                player.balance += player.bets[0] 
-
-        player.reset_bet()
+            for hand_index, bet in enumerate(player.bets):
+                outcome = rules.outcome(player, hand_index, host_value, host_natural)
+                self.renderer.message(OUTCOME_MESSAGES[outcome], player.name, self.host.name)
+                payout = rules.payout(outcome, bet)
+                player.balance += payout
+                if self.event_log is not None and bet:
+                    self.event_log.settle(player, hand_index, payout)
 
     def is_turn_over(self, player, hand_index=0):
         hand_value = player.calculate_hand_value(hand_index)
         return hand_value >= 21
 
     def print_results(self):
-        print("Round End:")
+        self.renderer.message(ROUND_END_MESSAGE)
         self.print_hands(False)
         self.update_balances()
-        print(SEPARATOR)
-        print("\n")
\ No newline at end of file
+        self.renderer.message(SEPARATOR)
+        self.renderer.message("\n")
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import pickle
+import struct
+import sys
+import zlib
+
+from deck import DEFAULT_PENETRATION
+from rng import DEFAULT_GENERATOR
+from simulation import HeadlessBlackjack, Policy, SimulationResult, run_rounds
+
+# Constants
+MAGIC = b"BJCK"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, CRC32 of the compressed state
+DEFAULT_CHECKPOINT_EVERY = 10000  # Rounds played between checkpoints
+
+
+def game_state(game, result, rounds, trajectory_every):
+    # Everything a resumed run needs; only taken between rounds, when no hands are in play
+    return {
+        "players": [(player.name, player.balance) for player in game.players],
+        "round_number": game.round_number,
+        "deck": game.deck.getstate(),
+        "penetration": game.deck.cut_card / len(game.deck.cards),
+        "rules": game.rules.config,
+        "policies": game.policies,
+        "result": result,
+        "rounds": rounds,
+        "trajectory_every": trajectory_every,
+    }
+
+
+def save_checkpoint(path, game, result, rounds, trajectory_every=0):
+    # Write a compressed snapshot to a temporary file, sync it, then rename it over the previous
+    # checkpoint, so a crash at any point leaves either the old or the new snapshot intact
+    data = zlib.compress(pickle.dumps(game_state(game, result, rounds, trajectory_every), pickle.HIGHEST_PROTOCOL))
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, zlib.crc32(data)))
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+        data = file.read()
+    magic, version, checksum = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a simulation checkpoint for this version")
+    if zlib.crc32(data) != checksum:
+        raise ValueError(f"{path} is corrupted")
+    return pickle.loads(zlib.decompress(data))
+
+
+def restore_game(state):
+    # Rebuild the game from a checkpoint; the deck continues from its saved order, position and RNG state
+    names = [name for name, _ in state["players"]]
+    game = HeadlessBlackjack(names, 0, state["policies"], penetration=state["penetration"], rules=state["rules"])
+    for player, (_, balance) in zip(game.players, state["players"]):
+        player.balance = balance
+    game.round_number = state["round_number"]
+    game.deck.setstate(state["deck"])
+    return game
+
+
+def run_checkpointed(game, result, rounds, path, checkpoint_every=DEFAULT_CHECKPOINT_EVERY, trajectory_every=0):
+    # Play until result.rounds reaches rounds, saving a checkpoint every checkpoint_every rounds
+    while result.rounds < rounds:
+        played = result.rounds
+        run_rounds(game, result, min(checkpoint_every, rounds - played), trajectory_every)
+        save_checkpoint(path, game, result, rounds, trajectory_every)
+        if result.rounds - played < min(checkpoint_every, rounds - played):
+            break  # Nobody has funds left
+    return result
+
+
+def simulate_checkpointed(player_names, initial_balance, rounds, path, policies=None,
+                          checkpoint_every=DEFAULT_CHECKPOINT_EVERY, trajectory_every=0, seed=None,
+                          num_decks=1, penetration=DEFAULT_PENETRATION, rules=None, generator=DEFAULT_GENERATOR):
+    # Same as simulate, saving progress to path so the run can be resumed after it is killed.
+    # Every checkpoint pickles the whole result, so trajectories are off unless asked for; with
+    # trajectory_every=1 a long run would rewrite an ever-growing list at every checkpoint.
+    game = HeadlessBlackjack(player_names, initial_balance, policies or Policy(), seed, num_decks, penetration,
+                             rules=rules, generator=generator)
+    result = SimulationResult(player_names, initial_balance)
+    return run_checkpointed(game, result, rounds, path, checkpoint_every, trajectory_every)
+
+
+def resume(path, rounds=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+    # Continue a checkpointed run; the result is identical to a run that was never interrupted.
+    # rounds extends (or shortens) the total number of rounds given when the run started.
+    state = load_checkpoint(path)
+    game = restore_game(state)
+    rounds = state["rounds"] if rounds is None else rounds
+    return run_checkpointed(game, state["result"], rounds, path, checkpoint_every, state["trajectory_every"])
+
+
+if __name__ == "__main__":
+    print(resume(sys.argv[1]).summary())
@@ -0,0 +1,440 @@
+import argparse
+import importlib.util
+import itertools
+import random
+import sys
+import time
+from fractions import Fraction
+from statistics import NormalDist
+
+from blackjack import Blackjack, HIT_ACTION, STAND_ACTION
+from dealer_odds import (BUST_INDEX, CARD_VALUES, DEALER_OUTCOMES, HOST_OUTCOMES, NATURAL, dealer_probabilities,
+                         full_shoe, infinite_deck_table, remove_card)
+from deck import ACE_VALUE, CARDS, Deck, InfiniteDeck
+from hand import BLACKJACK_VALUE, SOFT_ACE_ADJUSTMENT, Hand
+from host import HIT_ON_SOFT_17, STAND_ON_SOFT_17, HOST_STAND_VALUE, Host
+from player import Player
+from rng import MT19937, PCG64
+from rules import THREE_TO_TWO, SIX_TO_FIVE, Rules
+from simulation import HeadlessBlackjack, InfiniteDeckBlackjack, Policy
+
+# Checks every fast path (running hand totals, dealing, settlement, host sampling) against a
+# deliberately naive reference, by exhaustive enumeration where the space is small and by seeded
+# random and statistical tests elsewhere. Every check's size scales linearly with `scale`.
+
+# Constants
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+ALPHA = 1e-6  # Significance level of the statistical checks; runs are seeded, so a pass is reproducible
+MAX_ENUMERATED_CARDS = 6  # Hands of up to this many cards are enumerated exhaustively
+SETTLEMENT_ROUNDS = 3000
+SHUFFLES = 20000
+HOST_HANDS = 40000
+RULE_VARIANTS = [
+    Rules(),
+    Rules(host_hits_soft_17=True, blackjack_payout=THREE_TO_TWO, surrender=True),
+    Rules(blackjack_payout=SIX_TO_FIVE, double_after_split=True, max_hands=4, num_decks=2),
+    Rules(surrender=True, num_decks=6),
+]
+CARDS_BY_VALUE = {value: [card for card in CARDS if card.value == value] for value in CARD_VALUES}
+
+
+def reference_value(values):
+    # Hand total and softness recounted from scratch: Aces are 11 until the hand would bust
+    total = sum(values)
+    soft_aces = values.count(ACE_VALUE)
+    while total > BLACKJACK_VALUE and soft_aces:
+        total -= SOFT_ACE_ADJUSTMENT
+        soft_aces -= 1
+    return total, soft_aces > 0
+
+
+def chi_square(observed, expected):
+    # Pearson statistic and degrees of freedom, skipping categories that cannot occur
+    statistic = 0.0
+    categories = 0
+    for count, expectation in zip(observed, expected):
+        if expectation > 0:
+            statistic += (count - expectation) ** 2 / expectation
+            categories += 1
+        elif count:
+            return float("inf"), max(categories - 1, 1)
+    return statistic, categories - 1
+
+
+def chi_square_critical(dof, alpha=ALPHA):
+    # Upper critical value of the chi-square distribution (Wilson-Hilferty approximation)
+    z = NormalDist().inv_cdf(1 - alpha)
+    return dof * (1 - 2 / (9 * dof) + z * (2 / (9 * dof)) ** 0.5) ** 3
+
+
+def check_chi_square(name, observed, expected, dof_adjustment=0):
+    statistic, dof = chi_square(observed, expected)
+    dof -= dof_adjustment
+    critical = chi_square_critical(dof)
+    if statistic > critical:
+        raise AssertionError(f"{name}: chi-square {statistic:.1f} exceeds {critical:.1f} ({dof} degrees of freedom)")
+    return statistic, dof
+
+
+def check_hand_values(rng, max_cards=MAX_ENUMERATED_CARDS):
+    # Every multiset of card values up to max_cards, in a random order, against the reference:
+    # the running total after each card, Hand built at once, recalculate, pop, and the NumPy engine
+    hands = [list(values) for count in range(1, max_cards + 1)
+             for values in itertools.combinations_with_replacement(CARD_VALUES, count)]
+    player = Player("Reference", 0)
+    for values in hands:
+        rng.shuffle(values)
+        cards = [rng.choice(CARDS_BY_VALUE[value]) for value in values]
+        player.reset_hand()
+        for count, card in enumerate(cards, 1):
+            player.hit(card)
+            expected = reference_value(values[:count])
+            hand = player.get_hand()
+            if (player.calculate_hand_value(), hand.is_soft) != expected:
+                raise AssertionError(f"Running total of {cards[:count]} is {hand.value}, expected {expected[0]}")
+
+        rebuilt = Hand(cards)
+        rebuilt.recalculate()
+        if (rebuilt.value, rebuilt.is_soft) != expected:
+            raise AssertionError(f"Hand({cards}) totals {rebuilt.value}, expected {expected[0]}")
+        if len(cards) > 1:
+            rebuilt.pop()
+            if (rebuilt.value, rebuilt.is_soft) != reference_value(values[:-1]):
+                raise AssertionError(f"Removing a card from {cards} left {rebuilt.value}")
+
+    if HAS_NUMPY:
+        check_vectorized_hand_values(hands)
+    return len(hands)
+
+
+def check_vectorized_hand_values(hands):
+    import numpy as np
+    from vectorized import add_cards
+
+    values = np.zeros((len(hands), max(map(len, hands))), dtype=np.int16)  # Short hands draw 0s
+    for row, hand in enumerate(hands):
+        values[row, :len(hand)] = hand
+    totals = np.zeros(len(hands), dtype=np.int16)
+    soft_aces = np.zeros(len(hands), dtype=np.int16)
+    for column in values.T:
+        add_cards(totals, soft_aces, column)
+    for hand, total, soft in zip(hands, totals.tolist(), (soft_aces > 0).tolist()):
+        if (total, soft) != reference_value(hand):
+            raise AssertionError(f"Vectorized total of {hand} is {total}, expected {reference_value(hand)[0]}")
+
+
+def generators():
+    return [MT19937, PCG64] if HAS_NUMPY else [MT19937]
+
+
+def check_dealing(rng, shoes=20):
+    # Dealing with any mix of deal() and hit() hands out each card of the shoe exactly once,
+    # stops at the cut card, and a restored deck deals the same cards as the original
+    checked = 0
+    for generator, num_decks, penetration in itertools.product(generators(), (1, 2, 6), (0.75, 1.0)):
+        deck = Deck(rng.getrandbits(32), num_decks, penetration, generator)
+        full = sorted(card.code for card in deck.shoe)
+        for _ in range(shoes):
+            dealt = []
+            while not deck.needs_shuffle() and deck.remaining():
+                if deck.remaining() >= 2 and rng.random() < 0.5:
+                    dealt.extend(deck.deal())
+                else:
+                    dealt.append(deck.hit())
+                if len(dealt) + deck.remaining() != len(full):
+                    raise AssertionError("Dealt and remaining cards should add up to the shoe")
+            if len(dealt) < deck.cut_card:
+                raise AssertionError(f"Shoe stopped after {len(dealt)} cards, before the cut card at {deck.cut_card}")
+            rest = [deck.hit() for _ in range(deck.remaining())]
+            if sorted(card.code for card in dealt + rest) != full:
+                raise AssertionError(f"{num_decks}-deck {generator} shoe did not deal every card exactly once")
+
+            deck.shuffle()
+            for _ in range(rng.randrange(len(full))):
+                deck.hit()
+            state = deck.getstate()
+            expected = [deck.hit() for _ in range(deck.remaining())]
+            deck.shuffle()
+            expected += deck.cards
+            restored = Deck(0, generator=generator)
+            restored.setstate(state)
+            replayed = [restored.hit() for _ in range(restored.remaining())]
+            restored.shuffle()
+            if replayed + restored.cards != expected:
+                raise AssertionError(f"Restored {generator} deck dealt different cards")
+            deck.shuffle()
+            checked += 1
+    return checked
+
+
+def check_shuffle_uniformity(rng, shuffles=SHUFFLES):
+    # Chi-square on where every card of a single deck lands after a shuffle (52 x 52 positions),
+    # for Deck.shuffle with each generator and for bulk shuffles through shuffle_decks
+    from deck import shuffle_decks
+    from rng import make_rng
+
+    expected = [shuffles / len(CARDS)] * len(CARDS) ** 2
+    index = {card: position for position, card in enumerate(CARDS)}
+    results = {}
+    for generator in generators():
+        deck = Deck(rng.getrandbits(32), generator=generator)
+        counts = [0] * len(CARDS) ** 2
+        for _ in range(shuffles):
+            deck.shuffle()
+            for position, card in enumerate(deck.cards):
+                counts[position * len(CARDS) + index[card]] += 1
+        # Row and column totals are fixed, leaving (52 - 1) ** 2 degrees of freedom
+        results[generator] = check_chi_square(f"{generator} shuffle", counts, expected, 2 * (len(CARDS) - 1))
+
+        decks = [Deck(generator=generator) for _ in range(100)]
+        shared = make_rng(rng.getrandbits(32), generator)
+        counts = [0] * len(CARDS) ** 2
+        for _ in range(shuffles // len(decks)):
+            shuffle_decks(decks, shared)
+            for deck in decks:
+                for position, card in enumerate(deck.cards):
+                    counts[position * len(CARDS) + index[card]] += 1
+        bulk_expected = [shuffles // len(decks) * len(decks) / len(CARDS)] * len(CARDS) ** 2
+        results[generator + " bulk"] = check_chi_square(f"{generator} bulk shuffle", counts, bulk_expected,
+                                                        2 * (len(CARDS) - 1))
+    return results
+
+
+class RandomPolicy(Policy):
+    # Takes every option at random, so settlement sees splits, doubles, surrenders and busts
+    def __init__(self, rng):
+        super().__init__()
+        self.rng = rng
+
+    def bet(self, game, player):
+        return self.rng.randrange(1, 50) * game.rules.bet_unit
+
+    def action(self, game, player, hand_index=0):
+        return HIT_ACTION if self.rng.random() < 0.4 else STAND_ACTION
+
+    def split(self, game, player, hand_index=0):
+        return self.rng.random() < 0.7
+
+    def double_down(self, game, player, hand_index=0):
+        return self.rng.random() < 0.3
+
+    def surrender(self, game, player):
+        return self.rng.random() < 0.2
+
+
+def reference_return(rules, player, hand_index, host):
+    # Exact amount returned for one hand, worked out from the Rules settings with Fractions
+    bet = Fraction(player.bets[hand_index])
+    hand = player.get_hand(hand_index)
+    value = reference_value([card.value for card in hand])[0]
+    host_value = reference_value([card.value for card in host.get_hand()])[0]
+    host_natural = host_value == BLACKJACK_VALUE and len(host.get_hand()) == 2
+    if player.surrendered:
+        return 0 if host_natural else bet / 2  # Late surrender: the host checks for a natural first
+    if value > BLACKJACK_VALUE:
+        return 0
+    if rules.blackjack_payout is not None:
+        natural = value == BLACKJACK_VALUE and len(hand) == 2 and len(player.hands) == 1
+        if natural and host_natural:
+            return bet
+        if natural:
+            return bet * (1 + Fraction(*rules.blackjack_payout))
+        if host_natural:
+            return 0
+    if host_value > BLACKJACK_VALUE or value > host_value:
+        return 2 * bet
+    return bet if value == host_value else 0
+
+
+def check_settlement(rng, rounds=SETTLEMENT_ROUNDS):
+    # Play random rounds up to settlement, then settle each one exactly with Fractions, with
+    # Blackjack.update_balances, HeadlessBlackjack.update_balances and, with NumPy, vectorized.balance_deltas
+    names = [f"Seat {seat}" for seat in range(5)]
+    for rules in RULE_VARIANTS:
+        game = HeadlessBlackjack(names, 10 ** 6, RandomPolicy(rng), rng.getrandbits(32), rules=rules)
+        for _ in range(rounds // len(RULE_VARIANTS)):
+            game.reset_for_new_round()
+            if not game.handle_bets():
+                continue
+            game.deal_initial_cards()
+            game.play_round()
+
+            before = [player.balance for player in game.players]
+            exact = [balance + sum(reference_return(rules, player, hand_index, game.host)
+                                   for hand_index in range(len(player.bets)))
+                     for player, balance in zip(game.players, before)]
+            Blackjack.update_balances(game)
+            expected = [player.balance for player in game.players]
+            if expected != exact:
+                raise AssertionError(f"Blackjack.update_balances paid {expected}, exact settlement is {exact} under {rules}")
+            for player, balance in zip(game.players, before):
+                player.balance = balance
+
+            game.update_balances()
+            if [player.balance for player in game.players] != expected:
+                raise AssertionError(f"HeadlessBlackjack settled {game.players} differently under {rules}")
+            if HAS_NUMPY:
+                check_vectorized_settlement(game, before, expected)
+    return rounds
+
+
+def check_vectorized_settlement(game, before, expected):
+    import numpy as np
+    from vectorized import balance_deltas
+
+    rules = game.rules
+    hands = [(seat, player, hand_index) for seat, player in enumerate(game.players)
+             for hand_index in range(len(player.bets))]
+    if not hands:
+        return
+
+    def column(values, dtype):
+        return np.array(values, dtype=dtype)
+
+    host_natural = rules.is_natural(game.host)
+    arguments = [
+        column([player.bets[hand_index] for _, player, hand_index in hands], np.int64),
+        column([player.calculate_hand_value(hand_index) for _, player, hand_index in hands], np.int16),
+        column([game.host.calculate_hand_value()] * len(hands), np.int16),
+    ]
+    naturals = [rules.is_natural(player, hand_index) for _, player, hand_index in hands]
+    arguments.append(column(naturals, bool) if rules.naturals else None)
+    arguments.append(column([host_natural] * len(hands), bool) if rules.host_checks_natural else None)
+    arguments.append(column([player.surrendered for _, player, _ in hands], bool))
+
+    deltas = balance_deltas(rules, column([seat for seat, _, _ in hands], np.int64), len(game.players), *arguments)
+    # balance_deltas nets out the bets, which were taken from the balance when they were placed
+    staked = [sum(player.bets) for player in game.players]
+    actual = [balance + delta + stake for balance, delta, stake in zip(before, deltas.tolist(), staked)]
+    if actual != expected:
+        raise AssertionError(f"Vectorized settlement gave {actual}, expected {expected}")
+
+
+def outcome_index(total, natural):
+    # Index into HOST_OUTCOMES of a finished host hand
+    if total > BLACKJACK_VALUE:
+        return len(HOST_OUTCOMES) - 1
+    if natural:
+        return HOST_OUTCOMES.index(NATURAL)
+    return total - HOST_STAND_VALUE
+
+
+def check_host_outcomes(name, counts, table):
+    # counts: {upcard: [hands ending in each HOST_OUTCOMES entry]}, compared upcard by upcard to the exact table
+    observed = []
+    expected = []
+    for upcard, row in counts.items():
+        total = sum(row)
+        observed += row
+        expected += [total * probability for probability in table[upcard]]
+    # Each upcard's total is fixed by the sample, so every upcard costs one degree of freedom
+    return check_chi_square(name, observed, expected, len(counts) - 1)
+
+
+def check_host_play(rng, hands=HOST_HANDS):
+    # Host hands dealt from real shoes and from the infinite deck, and the infinite-deck samplers,
+    # against the exact outcome tables of dealer_odds (which reproduce the known bust rates per upcard)
+    results = {}
+    for hits_soft_17, hit_table in ((False, STAND_ON_SOFT_17), (True, HIT_ON_SOFT_17)):
+        table = infinite_deck_table(hits_soft_17)
+        host = Host(hit_table)
+        deck = InfiniteDeck(rng.getrandbits(32))
+        counts = {upcard: [0] * len(HOST_OUTCOMES) for upcard in CARD_VALUES}
+        for _ in range(hands):
+            host.reset_hand()
+            host.receive_hand(*deck.deal())
+            while host.must_hit():
+                host.hit(deck.hit())
+            hand = host.get_hand()
+            counts[hand[0].value][outcome_index(hand.value, hand.value == BLACKJACK_VALUE and len(hand) == 2)] += 1
+        label = "H17" if hits_soft_17 else "S17"
+        results[f"infinite deck {label}"] = check_host_outcomes(f"Host play on an infinite deck ({label})", counts, table)
+
+        game = InfiniteDeckBlackjack(["Reference"], 0, Policy(), rng.getrandbits(32),
+                                     rules=Rules(host_hits_soft_17=hits_soft_17))
+        counts = {upcard: [0] * len(HOST_OUTCOMES) for upcard in CARD_VALUES}
+        for _ in range(hands):
+            game.host.reset_hand()
+            game.host.receive_hand(*game.deck.deal())
+            game.host_turn()
+            counts[game.host_upcard().value][outcome_index(*game.host_result)] += 1
+        results[f"sampled {label}"] = check_host_outcomes(f"InfiniteDeckBlackjack host sampling ({label})", counts, table)
+
+        if HAS_NUMPY:
+            results[f"vectorized {label}"] = check_vectorized_host_outcomes(rng, hands, hits_soft_17, table)
+
+    # A freshly shuffled single deck per hand, against the exact composition-dependent distribution
+    deck = Deck(rng.getrandbits(32))
+    host = Host()
+    counts = {upcard: [0] * len(DEALER_OUTCOMES) for upcard in CARD_VALUES}
+    for _ in range(hands):
+        deck.shuffle()
+        host.reset_hand()
+        host.receive_hand(*deck.deal())
+        while host.must_hit():
+            host.hit(deck.hit())
+        value = host.calculate_hand_value()
+        counts[host.get_hand()[0].value][BUST_INDEX if value > BLACKJACK_VALUE else value - HOST_STAND_VALUE] += 1
+    shoe = full_shoe(1)
+    exact = {upcard: tuple(dealer_probabilities(remove_card(shoe, upcard), upcard).values()) for upcard in CARD_VALUES}
+    results["single deck S17"] = check_host_outcomes("Host play on a single deck", counts, exact)
+    return results
+
+
+def check_vectorized_host_outcomes(rng, hands, hits_soft_17, table):
+    import numpy as np
+    from vectorized import sample_host_outcomes
+
+    generator = np.random.default_rng(rng.getrandbits(32))
+    upcards = generator.integers(CARD_VALUES[0], CARD_VALUES[-1] + 1, hands)
+    totals, naturals = sample_host_outcomes(upcards, generator, hits_soft_17)
+    outcomes = np.where(naturals, HOST_OUTCOMES.index(NATURAL),
+                        np.where(totals > BLACKJACK_VALUE, len(HOST_OUTCOMES) - 1, totals - HOST_STAND_VALUE))
+    counts = {upcard: np.bincount(outcomes[upcards == upcard], minlength=len(HOST_OUTCOMES)).tolist()
+              for upcard in CARD_VALUES}
+    label = "H17" if hits_soft_17 else "S17"
+    return check_host_outcomes(f"Vectorized host sampling ({label})", counts, table)
+
+
+CHECKS = {
+    "hand values": lambda rng, scale: check_hand_values(rng),
+    "dealing": lambda rng, scale: check_dealing(rng, max(1, int(20 * scale))),
+    "shuffle uniformity": lambda rng, scale: check_shuffle_uniformity(rng, max(1000, int(SHUFFLES * scale))),
+    "settlement": lambda rng, scale: check_settlement(rng, max(len(RULE_VARIANTS), int(SETTLEMENT_ROUNDS * scale))),
+    "host play": lambda rng, scale: check_host_play(rng, max(5000, int(HOST_HANDS * scale))),
+}
+
+
+def run_checks(names=None, scale=1.0, seed=0):
+    # Run the named checks (all by default) and return {name: (passed, seconds, detail)}
+    results = {}
+    for name in names or CHECKS:
+        start = time.perf_counter()
+        try:
+            detail = CHECKS[name](random.Random(f"{seed}:{name}"), scale)
+            passed = True
+        except AssertionError as error:
+            detail = str(error)
+            passed = False
+        results[name] = (passed, time.perf_counter() - start, detail)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the game's fast paths against reference semantics.")
+    parser.add_argument("names", nargs="*", help=f"checks to run (default: all): {', '.join(CHECKS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the size of every check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(CHECKS)
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    results = run_checks(args.names, args.scale, args.seed)
+    for name, (passed, seconds, detail) in results.items():
+        print(f"{'ok  ' if passed else 'FAIL'} {name:20} {seconds:6.2f}s  {detail}")
+    return 0 if all(passed for passed, _, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+from functools import lru_cache
+
+from deck import ACE_VALUE, CARDS
+from hand import BLACKJACK_VALUE, SOFT_ACE_ADJUSTMENT
+from host import HOST_STAND_VALUE, SOFT_OFFSET, STAND_ON_SOFT_17, HIT_ON_SOFT_17
+
+# Constants
+CARD_VALUES = tuple(range(2, ACE_VALUE + 1))  # Compositions count cards by value: index 0 is 2, index 9 is Ace
+DEALER_OUTCOMES = list(range(HOST_STAND_VALUE, BLACKJACK_VALUE + 1)) + ["bust"]
+BUST_INDEX = len(DEALER_OUTCOMES) - 1
+CACHE_SIZE = 2 ** 18  # Bounded memo of (composition, total, soft) states
+NATURAL = "blackjack"  # Two-card 21, kept apart from other 21s in the infinite-deck table
+HOST_OUTCOMES = DEALER_OUTCOMES[:-1] + [NATURAL] + DEALER_OUTCOMES[-1:]
+# Final host total of every HOST_OUTCOMES entry, with naturals as 21 and busts as 22
+HOST_OUTCOME_TOTALS = DEALER_OUTCOMES[:-1] + [BLACKJACK_VALUE, BLACKJACK_VALUE + 1]
+
+
+def composition_of(cards):
+    # Count cards by blackjack value
+    counts = [0] * len(CARD_VALUES)
+    for card in cards:
+        counts[card.value - CARD_VALUES[0]] += 1
+    return tuple(counts)
+
+
+def full_shoe(num_decks=1):
+    return tuple(count * num_decks for count in composition_of(CARDS))
+
+
+def remove_card(composition, value):
+    index = value - CARD_VALUES[0]
+    if not composition[index]:
+        raise ValueError(f"No card of value {value} left in the shoe")
+    return composition[:index] + (composition[index] - 1,) + composition[index + 1:]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def final_total_probabilities(composition, total, soft):
+    # Probability of each DEALER_OUTCOMES entry for a host holding `total` (soft if an Ace counts as 11)
+    # and drawing from `composition` until reaching HOST_STAND_VALUE.
+    # If the shoe runs out first the remaining probability is dropped.
+    if total > BLACKJACK_VALUE:
+        return tuple(1.0 if index == BUST_INDEX else 0.0 for index in range(len(DEALER_OUTCOMES)))
+    if total >= HOST_STAND_VALUE:
+        return tuple(1.0 if index == total - HOST_STAND_VALUE else 0.0 for index in range(len(DEALER_OUTCOMES)))
+
+    remaining = sum(composition)
+    result = [0.0] * len(DEALER_OUTCOMES)
+    for index, count in enumerate(composition):
+        if not count:
+            continue
+
+        value = CARD_VALUES[index]
+        new_total = total + value
+        soft_aces = soft + (value == ACE_VALUE)
+        if new_total > BLACKJACK_VALUE and soft_aces:
+            new_total -= SOFT_ACE_ADJUSTMENT
+            soft_aces -= 1
+        new_soft = soft_aces > 0
+
+        next_composition = composition[:index] + (count - 1,) + composition[index + 1:]
+        probability = count / remaining
+        for outcome, outcome_probability in enumerate(final_total_probabilities(next_composition, new_total, new_soft)):
+            result[outcome] += probability * outcome_probability
+
+    return tuple(result)
+
+
+def dealer_probabilities(composition, upcard):
+    # Exact distribution of the host's final total given its upcard value (Aces are 11) and the
+    # composition of the cards left in the shoe, with the upcard already removed
+    probabilities = final_total_probabilities(tuple(composition), upcard, upcard == ACE_VALUE)
+    return dict(zip(DEALER_OUTCOMES, probabilities))
+
+
+INFINITE_DECK_WEIGHTS = tuple(count / len(CARDS) for count in full_shoe(1))
+
+
+def infinite_deck_final(total, soft, hit_table, memo):
+    # Same recursion as final_total_probabilities, drawing every card with its single-deck
+    # frequency and stopping where Host.must_hit would
+    key = (total, soft)
+    if key not in memo:
+        result = [0.0] * len(DEALER_OUTCOMES)
+        if total > BLACKJACK_VALUE:
+            result[BUST_INDEX] = 1.0
+        elif not hit_table[total + SOFT_OFFSET if soft else total]:
+            result[total - HOST_STAND_VALUE] = 1.0
+        else:
+            for value, probability in zip(CARD_VALUES, INFINITE_DECK_WEIGHTS):
+                new_total = total + value
+                soft_aces = soft + (value == ACE_VALUE)
+                if new_total > BLACKJACK_VALUE and soft_aces:
+                    new_total -= SOFT_ACE_ADJUSTMENT
+                    soft_aces -= 1
+                for outcome, outcome_probability in enumerate(infinite_deck_final(new_total, soft_aces > 0, hit_table, memo)):
+                    result[outcome] += probability * outcome_probability
+        memo[key] = tuple(result)
+    return memo[key]
+
+
+@lru_cache(maxsize=None)
+def infinite_deck_table(hits_soft_17=False):
+    # Exact host outcome distribution for every upcard with an infinite deck, computed once on first use:
+    # {upcard: (p for each HOST_OUTCOMES entry)}. Naturals are split out of 21, and nothing is
+    # conditioned on the host checking for blackjack, matching how rounds are played here.
+    hit_table = HIT_ON_SOFT_17 if hits_soft_17 else STAND_ON_SOFT_17
+    memo = {}
+    table = {}
+    for upcard in CARD_VALUES:
+        row = [0.0] * len(HOST_OUTCOMES)
+        for value, probability in zip(CARD_VALUES, INFINITE_DECK_WEIGHTS):
+            if upcard + value == BLACKJACK_VALUE:
+                row[HOST_OUTCOMES.index(NATURAL)] += probability
+                continue
+            total = upcard + value
+            soft_aces = (upcard == ACE_VALUE) + (value == ACE_VALUE)
+            if total > BLACKJACK_VALUE:
+                total -= SOFT_ACE_ADJUSTMENT
+                soft_aces -= 1
+            for outcome, outcome_probability in enumerate(infinite_deck_final(total, soft_aces > 0, hit_table, memo)):
+                row[outcome if outcome < BUST_INDEX else len(HOST_OUTCOMES) - 1] += probability * outcome_probability
+        table[upcard] = tuple(row)
+    return table
+
+
+def infinite_deck_probabilities(upcard, hits_soft_17=False):
+    # Same format as dealer_probabilities, with naturals counted as 21
+    row = infinite_deck_table(hits_soft_17)[upcard]
+    probabilities = dict(zip(HOST_OUTCOMES, row))
+    probabilities[BLACKJACK_VALUE] += probabilities.pop(NATURAL)
+    return probabilities
+
+
+def cache_info():
+    return final_total_probabilities.cache_info()
+
+
+if __name__ == "__main__":
+    shoe = full_shoe(6)
+    for upcard in CARD_VALUES:
+        outcomes = dealer_probabilities(remove_card(shoe, upcard), upcard)
+        print(upcard, " ".join(f"{outcome}: {probability:.4f}" for outcome, probability in outcomes.items()))
+    print(cache_info())
@@ -1,32 +1,125 @@
-import random
-from collections import namedtuple
+from rng import DEFAULT_GENERATOR, make_rng, restore_rng
+
+# Define the suits and ranks for a standard deck
+SUITS = ["♣", "♦", "♥", "♠"]
+FACE_CARDS = ["A", "J", "Q", "K"]
+RANKS = list(map(str, range(2, 11))) + FACE_CARDS  # Ranks now include number and face cards
+ACE_VALUE = 11  # Aces count as 11 until they would bust the hand
+# Precomputed blackjack value of every rank, so hand totals never parse strings
+RANK_VALUES = {rank: (int(rank) if rank.isdigit() else 10) for rank in RANKS}
+RANK_VALUES["A"] = ACE_VALUE
+DEFAULT_PENETRATION = 0.75  # Fraction of the shoe dealt before the cut card
+
+
+class Card:
+    # Compact card representation: printable suit/rank plus precomputed value and integer code
+    __slots__ = ("suit", "rank", "value", "code")
+
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+        self.value = RANK_VALUES[rank]
+        self.code = SUITS.index(suit) * len(RANKS) + RANKS.index(rank)
+
+    def __repr__(self):
+        return f"Card(suit={self.suit!r}, rank={self.rank!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Card) and self.code == other.code
+
+    def __hash__(self):
+        return self.code
+
+    def __iter__(self):
+        # Allow unpacking like the original (suit, rank) tuple
+        yield self.suit
+        yield self.rank
+
+    @staticmethod
+    def from_code(code):
+        return CARDS[code]
+
+
+# One shared instance per card; decks reuse them instead of allocating new cards
+CARDS = tuple(Card(suit, rank) for suit in SUITS for rank in RANKS)
 
-# Define a namedtuple for card representation
-Card = namedtuple('Card', ['suit', 'rank'])
 
 class Deck:
-    # Define the suits and face cards for a standard deck
-    SUITS = ["♣", "♦", "♥", "♠"]
-    FACE_CARDS = ["A", "J", "Q", "K"]
-    RANKS = list(map(str, range(2, 11))) + FACE_CARDS  # Ranks now include number and face cards
+    SUITS = SUITS
+    FACE_CARDS = FACE_CARDS
+    RANKS = RANKS
     MIN_RANK = 2  # Minimum rank value for cards
     MAX_RANK = 11  # Maximum rank value for cards, assuming Ace counts as 11 initially
     
-    def __init__(self):
-        # Create and shuffle a new deck of cards
-        self.reinitialize_deck()
+    def __init__(self, seed=None, num_decks=1, penetration=DEFAULT_PENETRATION, generator=DEFAULT_GENERATOR):
+        # Each deck owns its random generator so tables never share RNG state
+        self.rng = make_rng(seed, generator)
+        self.num_decks = num_decks
+        # Build the shoe once; it is reshuffled in place and dealt by index
+        self.shoe = CARDS * num_decks  # Unshuffled order, used to apply bulk permutations
+        self.cards = list(self.shoe)
+        self.cut_card = int(len(self.cards) * penetration)  # Reshuffle once this many cards are dealt
+        self.position = 0
+        self.tracker = None  # Optional ShoeTracker told about every dealt card and shuffle
+        self.shuffle()
     
     def __repr__(self):
         # Return a string representation of the deck
         return ' '.join(f"{card.suit}{card.rank}" for card in self.deck) + "\n\n"
-    
+
+    @property
+    def deck(self):
+        # Cards that have not been dealt yet
+        return self.cards[self.position:]
+
+    def remaining(self):
+        return len(self.cards) - self.position
+
     def shuffle(self):
-        # Shuffle the deck using the random.shuffle() function
-        random.shuffle(self.deck)
+        # Gather every card back into the shoe and shuffle it with the deck's own random generator
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def reorder(self, order):
+        # Put the whole shoe in the given order (indexes into the unshuffled shoe) and start dealing from the top
+        shoe = self.shoe
+        self.cards[:] = [shoe[index] for index in order]
+        self.position = 0
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def getstate(self):
+        # Everything needed to continue dealing exactly where this deck is now
+        return {
+            "rng": self.rng.getstate(),
+            "cards": bytes(card.code for card in self.cards),
+            "position": self.position,
+            "cut_card": self.cut_card,
+        }
+
+    def setstate(self, state):
+        self.rng = restore_rng(state["rng"])
+        self.cards[:] = [CARDS[code] for code in state["cards"]]
+        self.num_decks = len(self.cards) // len(CARDS)
+        self.shoe = CARDS * self.num_decks
+        self.position = state["position"]
+        self.cut_card = state["cut_card"]
+        if self.tracker is not None:
+            self.tracker.attach(self)  # Recount the cards already dealt
+
+    def needs_shuffle(self):
+        # Check if the cut card has been reached
+        return self.position >= self.cut_card
 
     def hit(self):
-        # Remove and return a card from the top of the deck
-        return self.deck.pop()
+        # Return the next card from the shoe
+        card = self.cards[self.position]
+        self.position += 1
+        if self.tracker is not None:
+            self.tracker.card_dealt(card)
+        return card
     
     def deal(self):
         # Ensure there are at least 2 cards to deal
@@ -35,20 +128,55 @@ class Deck:
             self.reinitialize_deck()
 
         # Deal two cards (as a tuple) from the top of the deck
-        card_1 = self.deck.pop()
-        card_2 = self.deck.pop()
+        card_1 = self.cards[self.position]
+        card_2 = self.cards[self.position + 1]
+        self.position += 2
+        if self.tracker is not None:
+            self.tracker.card_dealt(card_1)
+            self.tracker.card_dealt(card_2)
         return card_1, card_2
 
     def is_empty(self):
-        # Check if deck list is empty
-        return len(self.deck) < 2
+        # Check if fewer than 2 cards remain in the shoe
+        return len(self.cards) - self.position < 2
     
     def reinitialize_deck(self):
-        # Reinitialize the deck to a full deck of 52 cards and shuffle
-        self.deck = [Card(suit, rank) for suit in Deck.SUITS for rank in Deck.RANKS]
+        # Bring the whole shoe back and shuffle it
         self.shuffle()
 
 
+class InfiniteDeck(Deck):
+    # Every card is drawn independently with single-deck frequencies, as if the shoe never ran down.
+    # Draws are made in blocks the size of the shoe and dealt by index like a normal shoe;
+    # trackers are not told about cards because there is nothing to count.
+    def shuffle(self):
+        self.cards[:] = self.rng.choices(CARDS, len(self.cards))
+        self.position = 0
+
+    def hit(self):
+        if self.position == len(self.cards):
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+    def deal(self):
+        return self.hit(), self.hit()
+
+    def needs_shuffle(self):
+        return False
+
+    def is_empty(self):
+        return False
+
+
+def shuffle_decks(decks, rng):
+    # Shuffle many equally sized shoes with one bulk call to a shared generator
+    orders = rng.permutations(len(decks), len(decks[0].cards))
+    for deck, order in zip(decks, orders):
+        deck.reorder(order)
+
+
 if __name__ == "__main__":
     deck = Deck()
-    print(deck)
\ No newline at end of file
+    print(deck)
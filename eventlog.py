@@ -0,0 +1,217 @@
+import copy
+import struct
+import sys
+
+from deck import Card
+from host import Host
+from player import Player
+
+# Record types
+TABLE = 1
+ROUND = 2
+BET = 3
+DEAL = 4
+HIT = 5
+STAND = 6
+SPLIT = 7
+DOUBLE = 8
+HOST_DRAW = 9
+SETTLE = 10
+SURRENDER = 11
+BALANCE = 12
+
+# Every record is a type byte and a payload length followed by the payload
+RECORD_HEADER = struct.Struct("<BH")
+PAYLOADS = {
+    ROUND: struct.Struct("<I"),  # round number
+    BET: struct.Struct("<Bq"),  # seat, amount
+    DEAL: struct.Struct("<BBB"),  # seat, card code, card code
+    HIT: struct.Struct("<BBB"),  # seat, hand index, card code
+    STAND: struct.Struct("<BB"),  # seat, hand index
+    SPLIT: struct.Struct("<BB"),  # seat, hand index
+    DOUBLE: struct.Struct("<BB"),  # seat, hand index
+    HOST_DRAW: struct.Struct("<B"),  # card code
+    SETTLE: struct.Struct("<BBqq"),  # seat, hand index, payout, balance after payout
+    SURRENDER: struct.Struct("<B"),  # seat
+    BALANCE: struct.Struct("<Bq"),  # seat, balance when the game started (e.g. resumed from a store)
+}
+TABLE_PAYLOAD = struct.Struct("<qB")  # initial balance, number of seats, then length-prefixed names
+NAME_LENGTH = struct.Struct("<B")
+HOST_SEAT = 255
+DEFAULT_BATCH_SIZE = 4096  # Records buffered before writing to disk
+
+
+class EventLogWriter:
+    # Append-only binary log of every round, written in batches
+    def __init__(self, path, player_names, initial_balance, batch_size=DEFAULT_BATCH_SIZE):
+        self.file = open(path, "ab")
+        self.batch_size = batch_size
+        self.buffer = bytearray()
+        self.pending = 0
+        self.seats = {name: seat for seat, name in enumerate(player_names)}
+
+        payload = bytearray(TABLE_PAYLOAD.pack(initial_balance, len(player_names)))
+        for name in player_names:
+            encoded = name.encode("utf-8")
+            payload += NAME_LENGTH.pack(len(encoded)) + encoded
+        self.write_payload(TABLE, bytes(payload))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_payload(self, record_type, payload):
+        self.buffer += RECORD_HEADER.pack(record_type, len(payload))
+        self.buffer += payload
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def write(self, record_type, *values):
+        self.write_payload(record_type, PAYLOADS[record_type].pack(*values))
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def round_start(self, round_number):
+        self.write(ROUND, round_number)
+
+    def bet(self, player, amount):
+        self.write(BET, self.seats[player.name], amount)
+
+    def deal(self, player, card_1, card_2):
+        seat = HOST_SEAT if isinstance(player, Host) else self.seats[player.name]
+        self.write(DEAL, seat, card_1.code, card_2.code)
+
+    def hit(self, player, hand_index, card):
+        self.write(HIT, self.seats[player.name], hand_index, card.code)
+
+    def stand(self, player, hand_index):
+        self.write(STAND, self.seats[player.name], hand_index)
+
+    def split(self, player, hand_index):
+        self.write(SPLIT, self.seats[player.name], hand_index)
+
+    def double(self, player, hand_index):
+        self.write(DOUBLE, self.seats[player.name], hand_index)
+
+    def surrender(self, player):
+        self.write(SURRENDER, self.seats[player.name])
+
+    def starting_balance(self, player):
+        self.write(BALANCE, self.seats[player.name], player.balance)
+
+    def host_draw(self, card):
+        self.write(HOST_DRAW, card.code)
+
+    def settle(self, player, hand_index, payout):
+        self.write(SETTLE, self.seats[player.name], hand_index, payout, player.balance)
+
+
+def read_events(path):
+    # Yield (record_type, values) for every record in a log file
+    with open(path, "rb") as file:
+        data = file.read()
+
+    offset = 0
+    while offset < len(data):
+        record_type, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if record_type == TABLE:
+            initial_balance, seats = TABLE_PAYLOAD.unpack_from(data, offset)
+            position = offset + TABLE_PAYLOAD.size
+            names = []
+            for _ in range(seats):
+                (name_length,) = NAME_LENGTH.unpack_from(data, position)
+                position += NAME_LENGTH.size
+                names.append(data[position:position + name_length].decode("utf-8"))
+                position += name_length
+            yield record_type, (initial_balance, names)
+        else:
+            yield record_type, PAYLOADS[record_type].unpack_from(data, offset)
+        offset += length
+
+
+class TableState:
+    # Game state rebuilt from a log: players, host and the current round
+    def __init__(self, player_names, initial_balance):
+        self.players = [Player(name, initial_balance) for name in player_names]
+        self.host = Host()
+        self.round_number = 0
+
+    def snapshot(self):
+        # Independent copy, so later records do not change a state that has already been handed out
+        return copy.deepcopy(self)
+
+    def start_round(self, round_number):
+        self.round_number = round_number
+        for player in self.players + [self.host]:
+            player.reset_hand()
+            player.reset_bet()
+
+    def apply(self, record_type, values):
+        if record_type == ROUND:
+            self.start_round(*values)
+        elif record_type == BET:
+            seat, amount = values
+            self.players[seat].place_bet(amount)
+        elif record_type == DEAL:
+            seat, code_1, code_2 = values
+            player = self.host if seat == HOST_SEAT else self.players[seat]
+            player.receive_hand(Card.from_code(code_1), Card.from_code(code_2))
+        elif record_type == HIT:
+            seat, hand_index, code = values
+            self.players[seat].hit(Card.from_code(code), hand_index)
+        elif record_type == SPLIT:
+            seat, hand_index = values
+            self.players[seat].split(hand_index)
+        elif record_type == DOUBLE:
+            seat, hand_index = values
+            self.players[seat].double_down(hand_index)
+        elif record_type == SURRENDER:
+            self.players[values[0]].surrender()
+        elif record_type == BALANCE:
+            seat, balance = values
+            self.players[seat].balance = balance
+        elif record_type == HOST_DRAW:
+            self.host.hit(Card.from_code(*values))
+        elif record_type == SETTLE:
+            seat, hand_index, payout, balance = values
+            player = self.players[seat]
+            player.balance += payout
+            if player.balance != balance:
+                raise ValueError(
+                    f"Round {self.round_number}: replayed balance {player.balance} "
+                    f"for {player.name} does not match logged balance {balance}"
+                )
+
+
+def replay(path):
+    # Rebuild game state from a log, yielding a snapshot of the TableState after every round
+    state = None
+    for record_type, values in read_events(path):
+        if record_type in (TABLE, ROUND) and state is not None and state.round_number:
+            yield state.snapshot()
+        if record_type == TABLE:
+            initial_balance, player_names = values
+            state = TableState(player_names, initial_balance)
+        else:
+            state.apply(record_type, values)
+
+    if state is not None and state.round_number:
+        yield state.snapshot()
+
+
+if __name__ == "__main__":
+    for state in replay(sys.argv[1]):
+        balances = ", ".join(f"{player.name}: ${player.balance}" for player in state.players)
+        print(f"Round {state.round_number}: {balances}")
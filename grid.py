@@ -0,0 +1,105 @@
+import hashlib
+import itertools
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from rules import Rules
+from simulation import Policy, simulate
+from strategy import DEFAULT_CACHE_DIR
+
+# Constants
+PLAYER_COUNTS = range(1, 7)
+DEFAULT_ROUNDS = 10000
+GRID_BALANCE = 10 ** 12  # Large enough that no seat goes broke during a cell
+CACHE_VERSION = 2  # Bump to invalidate cached cells when the game logic changes
+STAT_FIELDS = ("rounds", "wins", "losses", "pushes", "wagered", "net")
+
+
+def flat_bet(play_policy):
+    # Bet policy that keeps the play policy's own flat bet
+    return play_policy
+
+
+def cell_key(rules, play_policy, bet_policy, num_players, rounds, seed):
+    # Hash of everything that determines a cell's result
+    config = (CACHE_VERSION, rules, play_policy, bet_policy, num_players, rounds, seed)
+    return hashlib.sha1(pickle.dumps(config, protocol=4)).hexdigest()[:16]
+
+
+def cell_path(key, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"grid_{key}.json")
+
+
+def run_cell(task):
+    # Simulate one cell and total the statistics of its seats
+    rules, play_policy, bet_policy, num_players, rounds, seed = task
+    names = [f"Player {seat + 1}" for seat in range(num_players)]
+    result = simulate(names, GRID_BALANCE, rounds, bet_policy(play_policy), trajectory_every=0, seed=seed, rules=rules)
+    totals = {field: sum(getattr(stats, field) for stats in result.players.values()) for field in STAT_FIELDS}
+    totals["ev_per_unit"] = totals["net"] / totals["wagered"] if totals["wagered"] else 0.0
+    return totals
+
+
+def save_cell(path, totals):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(totals, file, sort_keys=True)
+    os.replace(temporary_path, path)
+
+
+def run_grid(rule_sets, strategies, bet_policies, player_counts=PLAYER_COUNTS, rounds=DEFAULT_ROUNDS,
+             seed=0, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    # Evaluate every (rules, strategy, bet policy, players) cell. Each axis is a dict of name -> value:
+    # Rules objects, play policies, and bet policies (callables wrapping a play policy, such as flat_bet).
+    # Cells found in the cache are loaded; only the rest are simulated, spread over a process pool.
+    # Returns {(rules name, strategy name, bet name, players): totals}, where totals["cached"] tells
+    # whether the cell came from the cache.
+    os.makedirs(cache_dir, exist_ok=True)
+    results = {}
+    pending = {}  # cell -> (key, task)
+    for rules_name, strategy_name, bet_name, num_players in itertools.product(
+            rule_sets, strategies, bet_policies, player_counts):
+        cell = (rules_name, strategy_name, bet_name, num_players)
+        task = (rule_sets[rules_name], strategies[strategy_name], bet_policies[bet_name], num_players, rounds, seed)
+        key = cell_key(*task)
+        try:
+            with open(cell_path(key, cache_dir)) as file:
+                results[cell] = dict(json.load(file), cached=True)
+        except FileNotFoundError:
+            pending[cell] = (key, task)
+
+    def collect(computed):
+        # Save every cell as soon as it finishes, so an interrupted grid keeps its finished cells
+        for (cell, (key, _)), totals in zip(pending.items(), computed):
+            save_cell(cell_path(key, cache_dir), totals)
+            results[cell] = dict(totals, cached=False)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [task for _, task in pending.values()]
+    if workers == 1 or len(tasks) <= 1:
+        collect(map(run_cell, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            collect(pool.map(run_cell, tasks))
+
+    return results
+
+
+def format_grid(results):
+    lines = [f"{'rules':12} {'strategy':12} {'bets':10} {'players':>7} {'rounds':>9} {'EV/unit':>9}"]
+    for (rules_name, strategy_name, bet_name, num_players), totals in sorted(results.items()):
+        lines.append(
+            f"{rules_name:12} {strategy_name:12} {bet_name:10} {num_players:>7} "
+            f"{totals['rounds']:>9} {totals['ev_per_unit']:>+9.4f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(format_grid(run_grid(
+        {"S17": Rules(), "H17": Rules(host_hits_soft_17=True)},
+        {"mimic": Policy(), "stand-12": Policy(stand_value=12)},
+        {"flat": flat_bet},
+    )))
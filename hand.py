@@ -0,0 +1,66 @@
+from deck import ACE_VALUE
+
+BLACKJACK_VALUE = 21
+SOFT_ACE_ADJUSTMENT = 10  # Difference between an Ace counted as 11 and as 1
+
+
+class Hand:
+    # A hand of cards that keeps its running total and soft-ace count up to date,
+    # so asking for its value never rescans the cards
+    __slots__ = ("cards", "value", "soft_aces")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.value = 0
+        self.soft_aces = 0  # Aces currently counted as 11
+        for card in cards:
+            self.append(card)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Hand):
+            return self.cards == other.cards
+        return self.cards == other
+
+    def __repr__(self):
+        return f"Hand({self.cards!r})"
+
+    @property
+    def is_soft(self):
+        return self.soft_aces > 0
+
+    def append(self, card):
+        self.cards.append(card)
+        self.value += card.value
+        if card.value == ACE_VALUE:
+            self.soft_aces += 1
+
+        # Count Aces as 1 while the hand would bust
+        while self.value > BLACKJACK_VALUE and self.soft_aces:
+            self.value -= SOFT_ACE_ADJUSTMENT
+            self.soft_aces -= 1
+
+    def pop(self, index=-1):
+        # Removing a card is rare (splits only), so the totals are simply rebuilt
+        card = self.cards.pop(index)
+        self.recalculate()
+        return card
+
+    def clear(self):
+        self.cards.clear()
+        self.value = 0
+        self.soft_aces = 0
+
+    def recalculate(self):
+        cards = self.cards[:]
+        self.clear()
+        for card in cards:
+            self.append(card)
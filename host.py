@@ -1,10 +1,29 @@
 from player import Player
 
+HOST_STAND_VALUE = 17  # The host stands on any total of 17 or more
+SOFT_OFFSET = 32  # Soft totals follow the hard totals in the hit tables (hands never reach 32)
+
+
+def build_hit_table(hits_soft_17=False):
+    # must_hit lookup indexed by hand value, plus SOFT_OFFSET when the hand is soft
+    hard = [value < HOST_STAND_VALUE for value in range(SOFT_OFFSET)]
+    soft = [value < HOST_STAND_VALUE or (hits_soft_17 and value == HOST_STAND_VALUE) for value in range(SOFT_OFFSET)]
+    return tuple(hard + soft)
+
+
+STAND_ON_SOFT_17 = build_hit_table(False)
+HIT_ON_SOFT_17 = build_hit_table(True)
+
+
 class Host(Player):
-    def __init__(self):
+    __slots__ = ("hit_table",)
+
+    def __init__(self, hit_table=STAND_ON_SOFT_17):
         # Initialize the Host class, inheriting from the Player class
         super().__init__(name="Host", initial_balance=0)
-    
+        self.hit_table = hit_table
+
     def must_hit(self):
-        # Determine if the host must hit based on the hand value
-        return self.calculate_hand_value() < 17
+        # Determine if the host must hit based on the hand value and the table's soft 17 rule
+        hand = self.get_hand(0)
+        return self.hit_table[hand.value + SOFT_OFFSET if hand.soft_aces else hand.value]
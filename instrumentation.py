@@ -0,0 +1,206 @@
+import json
+import time
+import tracemalloc
+
+# Constants
+PHASES = ("reset_for_new_round", "handle_bets", "deal_initial_cards", "play_round", "host_turn", "update_balances")
+NUM_BUCKETS = 40  # Bucket k holds latencies below 2**k nanoseconds
+ROUND_PHASE = "reset_for_new_round"  # Called exactly once per round
+CLASS_METHOD = object()  # Marks a wrapped attribute that was not set on the instance before
+
+
+def install(target, name, wrapper):
+    # Set wrapper as an instance attribute and return what remove() needs to undo it
+    wrapper.previous = vars(target).get(name, CLASS_METHOD)
+    wrapper.detached = False
+    setattr(target, name, wrapper)
+    return target, name, wrapper
+
+
+def remove(installed):
+    # Undo install() calls in reverse order. A wrapper another tool has since wrapped again stays in
+    # its chain, so that tool keeps working, but it is marked detached and only calls through; the
+    # other tool's detach then skips it when putting back what it replaced.
+    for target, name, wrapper in reversed(installed):
+        wrapper.detached = True
+        if vars(target).get(name) is wrapper:
+            previous = wrapper.previous
+            while getattr(previous, "detached", False):
+                previous = previous.previous
+            if previous is CLASS_METHOD:
+                delattr(target, name)
+            else:
+                setattr(target, name, previous)
+
+
+class LatencyHistogram:
+    # Power-of-two latency buckets: constant memory and one integer operation per sample
+    def __init__(self):
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        self.buckets[min(elapsed_ns.bit_length(), NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the requested percentile, in nanoseconds
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(2 ** bucket, self.max_ns)
+        return 0
+
+    def summary(self):
+        return {
+            "calls": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) / 1e3,
+            "p99_us": self.percentile(0.99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "buckets": {f"<{2 ** bucket}ns": count for bucket, count in enumerate(self.buckets) if count},
+        }
+
+
+class Instrumentation:
+    # Opt-in timing of the round lifecycle. attach() wraps the phase methods on one game
+    # instance; games that are never attached run the original methods with no overhead.
+    def __init__(self, snapshot_every=None, on_snapshot=None):
+        self.histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.rounds = 0
+        self.reshuffles = 0
+        self.snapshot_every = snapshot_every
+        self.on_snapshot = on_snapshot or (lambda instrumentation: print(instrumentation.format_text()))
+        self.attached = []  # install() records to undo on detach
+
+    def attach(self, game):
+        for phase in PHASES:
+            self.wrap(game, phase, self.timed(phase, getattr(game, phase)))
+        self.wrap(game.deck, "shuffle", self.counted_shuffle(game.deck.shuffle))
+        return game
+
+    def detach(self):
+        remove(self.attached)
+        self.attached.clear()
+
+    def wrap(self, target, name, wrapper):
+        self.attached.append(install(target, name, wrapper))
+
+    def timed(self, phase, method):
+        histogram = self.histograms[phase]
+        counts_rounds = phase == ROUND_PHASE
+
+        def wrapper(*args, **kwargs):
+            if wrapper.detached:
+                return method(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter_ns() - start)
+                if counts_rounds:
+                    self.round_finished()
+        return wrapper
+
+    def counted_shuffle(self, shuffle):
+        def wrapper():
+            if not wrapper.detached:
+                self.reshuffles += 1
+            shuffle()
+        return wrapper
+
+    def round_finished(self):
+        self.rounds += 1
+        if self.snapshot_every and self.rounds % self.snapshot_every == 0:
+            self.on_snapshot(self)
+
+    def snapshot(self):
+        return {
+            "rounds": self.rounds,
+            "reshuffles": self.reshuffles,
+            "phases": {phase: histogram.summary() for phase, histogram in self.histograms.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def format_text(self):
+        lines = [f"Rounds: {self.rounds}, reshuffles: {self.reshuffles}"]
+        for phase, histogram in self.histograms.items():
+            summary = histogram.summary()
+            lines.append(
+                f"{phase:20} calls {summary['calls']:>9}  mean {summary['mean_us']:>8.1f}us  "
+                f"p50 {summary['p50_us']:>8.1f}us  p99 {summary['p99_us']:>8.1f}us  max {summary['max_us']:>8.1f}us"
+            )
+        return "\n".join(lines)
+
+
+class AllocationBudgetExceeded(RuntimeError):
+    pass
+
+
+class AllocationBudget:
+    # Measure the peak bytes allocated from the start of each round to its settlement with
+    # tracemalloc, and raise AllocationBudgetExceeded when a round goes over max_bytes.
+    # Tracing slows everything down, so attach it for tests and profiling runs only.
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.rounds = 0
+        self.total_bytes = 0
+        self.max_seen = 0
+        self.round_start = 0
+        self.attached = []  # install() records to undo on detach
+        self.started_tracing = False  # Only stop tracemalloc on detach if attach started it
+
+    def attach(self, game):
+        start_round = game.reset_for_new_round
+        settle = game.update_balances
+
+        def measured_start(*args, **kwargs):
+            if measured_start.detached:
+                return start_round(*args, **kwargs)
+            tracemalloc.reset_peak()
+            self.round_start = tracemalloc.get_traced_memory()[0]
+            return start_round(*args, **kwargs)
+
+        def measured_settle(*args, **kwargs):
+            result = settle(*args, **kwargs)
+            if not measured_settle.detached:
+                self.record(tracemalloc.get_traced_memory()[1] - self.round_start)
+            return result
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        # Wrappers installed earlier (e.g. Instrumentation's) are put back on detach
+        self.attached.append(install(game, "reset_for_new_round", measured_start))
+        self.attached.append(install(game, "update_balances", measured_settle))
+        return game
+
+    def detach(self):
+        remove(self.attached)
+        self.attached.clear()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def record(self, allocated):
+        self.rounds += 1
+        self.total_bytes += allocated
+        self.max_seen = max(self.max_seen, allocated)
+        if self.max_bytes is not None and allocated > self.max_bytes:
+            raise AllocationBudgetExceeded(
+                f"Round allocated {allocated} bytes, budget is {self.max_bytes} bytes"
+            )
+
+    @property
+    def mean_bytes(self):
+        return self.total_bytes / self.rounds if self.rounds else 0.0
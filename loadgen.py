@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import random
+import time
+
+from blackjack import HIT_ACTION, STAND_ACTION
+from host import HOST_STAND_VALUE
+from server import DEFAULT_HOST, DEFAULT_PORT, MAX_SEATS, NO
+
+# Constants
+DEFAULT_TABLES = 100
+DEFAULT_DURATION = 10.0
+DEFAULT_BET = 1
+
+
+class LoadStats:
+    def __init__(self):
+        self.actions = 0
+        self.rounds = 0
+
+
+async def bot(host, port, table_id, name, stats, deadline, delay=0.0):
+    # Connect, join a table and answer every prompt like the host would play
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"JOIN {table_id} {name}\n".encode())
+
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+
+            prompt = line.decode().split()
+            if prompt[0] == "BET?":
+                balance, bet_unit = int(prompt[1]), int(prompt[2])
+                answer = str(min(DEFAULT_BET * bet_unit, balance - balance % bet_unit))
+            elif prompt[0] == "ACTION?":
+                answer = HIT_ACTION if int(prompt[2]) < HOST_STAND_VALUE else STAND_ACTION
+            elif prompt[0] in ("SURRENDER?", "SPLIT?", "DOUBLE?"):
+                answer = NO
+            else:
+                if prompt[0] == "RESULT":
+                    stats.rounds += 1
+                elif prompt[0] in ("BROKE", "ERROR"):
+                    break
+                continue
+
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(answer.encode() + b"\n")
+            stats.actions += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host=DEFAULT_HOST, port=DEFAULT_PORT, tables=DEFAULT_TABLES, players=MAX_SEATS,
+                   duration=DEFAULT_DURATION, slow_tables=0, slow_delay=1.0):
+    # Drive `tables` tables with `players` bots each; the first slow_tables tables answer slowly
+    stats = LoadStats()
+    run_tag = f"{random.randrange(16 ** 6):06x}"  # Reruns never collide with tables from an earlier run
+    start = time.perf_counter()
+    deadline = start + duration
+    bots = [
+        bot(host, port, f"{run_tag}-{table}", f"bot{seat}", stats, deadline, slow_delay if table < slow_tables else 0.0)
+        for table in range(tables)
+        for seat in range(players)
+    ]
+    await asyncio.gather(*bots, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    return stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running Blackjack server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--tables", type=int, default=DEFAULT_TABLES)
+    parser.add_argument("--players", type=int, default=MAX_SEATS, help="bots per table")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds to run")
+    parser.add_argument("--slow-tables", type=int, default=0, help="tables whose bots answer slowly")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="seconds slow bots wait per answer")
+    args = parser.parse_args()
+
+    stats, elapsed = asyncio.run(run_load(args.host, args.port, args.tables, args.players, args.duration,
+                                          args.slow_tables, args.slow_delay))
+    print(f"{stats.actions} actions, {stats.rounds} player rounds in {elapsed:.1f}s "
+          f"({stats.actions / elapsed:.0f} actions/s)")
+
+
+if __name__ == "__main__":
+    main()
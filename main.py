@@ -1,4 +1,18 @@
-from blackjack import Blackjack  
+import argparse
+import json
+import sys
+
+# Only argparse and json are imported up front. Every subcommand imports the modules it needs when
+# it runs, so a short job never loads NumPy, SQLite, asyncio or the process pool unless it uses them.
+
+# Constants
+MAX_PLAYERS = 6
+DEFAULT_SIMULATION_ROUNDS = 100000
+DEFAULT_SIMULATION_BALANCE = 10 ** 9
+# Same defaults as deck.DEFAULT_PENETRATION and rng.DEFAULT_GENERATOR, repeated so --help loads neither module
+DEFAULT_PENETRATION = 0.75
+DEFAULT_GENERATOR = "mt19937"
+
 
 def get_player_names(num_players):
     # Get names of players from user input
@@ -37,9 +51,250 @@ def main():
         initial_balance = get_initial_balance()
             
         # Create a Blackjack game instance and start the game
+        from blackjack import Blackjack
         blackjack = Blackjack(player_names,initial_balance)
         blackjack.start_game()
-    
+
+
+def table_rules(args):
+    from rules import Rules, parse_payout
+    payout = None if args.blackjack_payout is None else parse_payout(str(args.blackjack_payout))
+    return Rules(host_hits_soft_17=args.h17, blackjack_payout=payout, double_after_split=args.das,
+                 max_hands=args.max_hands, surrender=args.surrender, num_decks=args.decks)
+
+
+def seat_names(args):
+    # --players takes either a seat count or a list of names
+    if len(args.players) == 1 and args.players[0].isdigit():
+        return [f"Player {seat + 1}" for seat in range(int(args.players[0]))]
+    return args.players
+
+
+def get_num_players():
+    # Get the number of players, asking again until it is a valid integer
+    while True:
+        try:
+            return int(input("Enter the number of players: "))
+        except ValueError:
+            print("Invalid input. Please enter a valid integer.")
+
+
+def run_play(args):
+    # Names and balance missing from the command line are prompted for; the table itself is always
+    # built from the flags, so rules, logging and storage options apply to prompted games too
+    from blackjack import Blackjack
+    player_names = seat_names(args) if args.players else get_player_names(get_num_players())
+    if not 1 <= len(player_names) <= MAX_PLAYERS:
+        print(f"Number of players must be between 1 and {MAX_PLAYERS}.")
+        return 2
+    initial_balance = args.balance if args.balance is not None else get_initial_balance()
+
+    renderer = None
+    if args.buffered:
+        from renderer import BufferedRenderer
+        renderer = BufferedRenderer()
+    strategy = None
+    if args.hints:
+        from strategy import basic_strategy
+        strategy = basic_strategy(args.decks)
+    event_log = None
+    if args.log:
+        from eventlog import EventLogWriter
+        event_log = EventLogWriter(args.log, player_names, initial_balance)
+    store = None
+    if args.store:
+        from store import BankrollStore
+        store = BankrollStore(args.store)
+
+    game = Blackjack(player_names, initial_balance, seed=args.seed, penetration=args.penetration, strategy=strategy,
+                     event_log=event_log, store=store, rules=table_rules(args), generator=args.generator,
+                     renderer=renderer)
+    try:
+        game.start_game()
+    finally:
+        if event_log is not None:
+            event_log.close()
+        if store is not None:
+            store.close()
+    return 0
+
+
+def play_policy(args):
+    from simulation import BasicStrategyPolicy, CountingBetPolicy, Policy
+    # Without --bet, policies bet the smallest amount the table's payouts settle exactly
+    if args.strategy == "basic":
+        from strategy import basic_strategy
+        policy = BasicStrategyPolicy(basic_strategy(args.decks), args.bet)
+    else:
+        policy = Policy(args.bet, args.stand_value)
+    if args.bets == "hi-lo":
+        policy = CountingBetPolicy(policy, args.bet)
+    return policy
+
+
+def run_simulate(args):
+    player_names = seat_names(args)
+    balance = DEFAULT_SIMULATION_BALANCE if args.balance is None else args.balance
+    rules = table_rules(args)
+    policy = play_policy(args)
+
+    if args.checkpoint:
+        from checkpoint import simulate_checkpointed
+        result = simulate_checkpointed(player_names, balance, args.rounds, args.checkpoint, policy,
+                                       trajectory_every=0, seed=args.seed, penetration=args.penetration,
+                                       rules=rules, generator=args.generator)
+    elif args.workers != 1:
+        from parallel import simulate_parallel
+        result = simulate_parallel(player_names, balance, args.rounds, policy, seed=args.seed or 0,
+                                   workers=args.workers, penetration=args.penetration, rules=rules,
+                                   generator=args.generator)
+    else:
+        from simulation import SimulationResult, run_rounds
+        if args.infinite_deck:
+            from simulation import InfiniteDeckBlackjack
+            game = InfiniteDeckBlackjack(player_names, balance, policy, args.seed, rules=rules, generator=args.generator)
+        else:
+            from simulation import HeadlessBlackjack
+            game = HeadlessBlackjack(player_names, balance, policy, args.seed, penetration=args.penetration,
+                                     rules=rules, generator=args.generator)
+        result = run_rounds(game, SimulationResult(player_names, balance), args.rounds, trajectory_every=0)
+
+    if args.json:
+        fields = ("rounds", "wins", "losses", "pushes", "wagered", "net", "ev_per_round", "ev_per_unit")
+        players = {name: {field: getattr(stats, field) for field in fields} for name, stats in result.players.items()}
+        print(json.dumps({"rounds": result.rounds, "players": players}, sort_keys=True))
+    else:
+        print(result.summary())
+    return 0
+
+
+def run_bench(args):
+    import bench
+    return bench.main(args.bench_arguments)
+
+
+def run_replay(args):
+    from eventlog import replay
+    state = None
+    for state in replay(args.path):
+        if args.every_round:
+            balances = ", ".join(f"{player.name}: ${player.balance}" for player in state.players)
+            print(f"Round {state.round_number}: {balances}")
+    if state is None:
+        print(f"{args.path} has no completed rounds")
+        return 1
+    if not args.every_round:
+        print(f"Rounds: {state.round_number}")
+        for player in state.players:
+            print(f"{player.name}: ${player.balance}")
+    return 0
+
+
+def add_table_arguments(parser):
+    parser.add_argument("--players", nargs="+", default=[], help="seat count or player names")
+    parser.add_argument("--balance", type=int, help="initial balance of every player")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--penetration", type=float, default=DEFAULT_PENETRATION, help="share of the shoe dealt before reshuffling")
+    parser.add_argument("--generator", default=DEFAULT_GENERATOR, choices=["mt19937", "pcg64"])
+    parser.add_argument("--h17", action="store_true", help="host hits soft 17")
+    parser.add_argument("--blackjack-payout", help="pay naturals at this ratio, e.g. 3:2 or 6:5")
+    parser.add_argument("--das", action="store_true", help="allow doubling after a split")
+    parser.add_argument("--max-hands", type=int, default=2, help="hands a player may hold after splitting")
+    parser.add_argument("--surrender", action="store_true", help="allow late surrender")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Blackjack: play a table, run simulations, benchmarks and log replays.")
+    parser.add_argument("--config", help="JSON file of option defaults, keyed by option name; flags override it")
+    commands = parser.add_subparsers(dest="command")
+
+    play = commands.add_parser("play", help="play at an interactive table")
+    add_table_arguments(play)
+    play.add_argument("--buffered", action="store_true", help="write output one round at a time")
+    play.add_argument("--hints", action="store_true", help="show basic strategy hints")
+    play.add_argument("--log", help="append every round to this event log")
+    play.add_argument("--store", help="keep balances and history in this SQLite database")
+    play.set_defaults(run=run_play)
+
+    simulate = commands.add_parser("simulate", help="play rounds headlessly and print the results")
+    add_table_arguments(simulate)
+    simulate.set_defaults(players=["1"])
+    simulate.add_argument("--rounds", type=int, default=DEFAULT_SIMULATION_ROUNDS)
+    simulate.add_argument("--strategy", default="mimic", choices=["mimic", "basic"], help="how hands are played")
+    simulate.add_argument("--stand-value", type=int, default=17, help="total the mimic strategy stands on")
+    simulate.add_argument("--bets", default="flat", choices=["flat", "hi-lo"], help="how bets are sized")
+    simulate.add_argument("--bet", type=int, help="bet unit (default: the smallest bet the payouts settle exactly)")
+    simulate.add_argument("--workers", type=int, default=1, help="processes to spread the rounds over (0: all cores)")
+    simulate.add_argument("--infinite-deck", action="store_true", help="draw from an infinite deck")
+    simulate.add_argument("--checkpoint", help="save progress to this file so the run can be resumed")
+    simulate.add_argument("--json", action="store_true", help="print the results as JSON")
+    simulate.set_defaults(run=run_simulate)
+
+    # Everything after "bench", including -h, is handed to bench.py's own parser
+    bench = commands.add_parser("bench", help="run the benchmarks (arguments are passed to bench.py)", add_help=False)
+    bench.set_defaults(run=run_bench)
+
+    replay = commands.add_parser("replay", help="rebuild balances from an event log")
+    replay.add_argument("path")
+    replay.add_argument("--every-round", action="store_true", help="print balances after every round")
+    replay.set_defaults(run=run_replay)
+
+    return parser, commands.choices
+
+
+def parse_args(argv=None):
+    parser, commands = build_parser()
+    args = parse_command_line(parser, argv)
+    if args.config and args.command:
+        # Config values become the subcommand's defaults, then the command line is parsed again over them
+        with open(args.config) as file:
+            config = json.load(file)
+        command = commands[args.command]
+        options = {action.dest for action in command._actions}
+        unknown = set(config) - options
+        if unknown:
+            parser.error(f"unknown options in {args.config}: {', '.join(sorted(unknown))}")
+        command.set_defaults(**config)
+        args = parse_command_line(parser, argv)
+    check_combinations(parser, args)
+    return args
+
+
+def check_combinations(parser, args):
+    # Reject option combinations a subcommand cannot honour instead of silently dropping one of them
+    if args.command == "simulate":
+        if args.checkpoint and args.workers != 1:
+            parser.error("--checkpoint runs in a single process and cannot be combined with --workers")
+        if args.infinite_deck and (args.checkpoint or args.workers != 1):
+            parser.error("--infinite-deck runs in a single process without checkpoints; drop --workers and --checkpoint")
+    uses_basic_strategy = args.command == "play" and args.hints or args.command == "simulate" and args.strategy == "basic"
+    if uses_basic_strategy:
+        # Basic strategy tables are built for a host standing on soft 17, without doubling after splits or surrender
+        unsupported = [flag for flag, enabled in (("--h17", args.h17), ("--das", args.das), ("--surrender", args.surrender))
+                       if enabled]
+        if unsupported:
+            option = "--hints" if args.command == "play" else "--strategy basic"
+            parser.error(f"{option} assumes S17 without doubling after splits or surrender; "
+                         f"it cannot be combined with {', '.join(unsupported)}")
+
+
+def parse_command_line(parser, argv):
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_arguments = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+    if args.command is None:
+        main()  # No subcommand: the original interactive prompts
+        return 0
+    return args.run(args)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
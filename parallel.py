@@ -0,0 +1,60 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from deck import DEFAULT_PENETRATION
+from rng import DEFAULT_GENERATOR
+from simulation import Policy, SimulationResult, simulate
+
+# Constants
+DEFAULT_SHARD_ROUNDS = 10000
+
+
+def shard_seeds(master_seed, count):
+    # Derive one independent seed per shard from the master seed
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+def shard_sizes(rounds, shard_rounds):
+    # Split the work into fixed-size shards; the layout never depends on the worker count
+    sizes = [shard_rounds] * (rounds // shard_rounds)
+    if rounds % shard_rounds:
+        sizes.append(rounds % shard_rounds)
+    return sizes
+
+
+def run_shard(task):
+    player_names, initial_balance, rounds, policies, seed, trajectory_every, num_decks, penetration, rules, generator = task
+    return simulate(player_names, initial_balance, rounds, policies, trajectory_every, seed,
+                    num_decks, penetration, rules, generator)
+
+
+def simulate_parallel(player_names, initial_balance, rounds, policies=None, seed=0,
+                      workers=None, shard_rounds=DEFAULT_SHARD_ROUNDS, trajectory_every=0,
+                      num_decks=1, penetration=DEFAULT_PENETRATION, rules=None, generator=DEFAULT_GENERATOR):
+    # Each shard is an independent session starting at initial_balance with its own seeded deck.
+    # Shards are merged in order, so a master seed gives the same result for any number of workers.
+    policies = policies or Policy()
+    sizes = shard_sizes(rounds, shard_rounds)
+    tasks = [
+        (player_names, initial_balance, size, policies, shard_seed, trajectory_every,
+         num_decks, penetration, rules, generator)
+        for size, shard_seed in zip(sizes, shard_seeds(seed, len(sizes)))
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    result = SimulationResult(player_names, initial_balance)
+    if workers == 1 or len(tasks) == 1:
+        for shard_result in map(run_shard, tasks):
+            result.merge(shard_result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for shard_result in pool.map(run_shard, tasks):
+                result.merge(shard_result)
+
+    return result
+
+
+if __name__ == "__main__":
+    print(simulate_parallel(["Player 1", "Player 2"], 10 ** 9, 200000, seed=42).summary())
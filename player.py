@@ -1,18 +1,31 @@
+from hand import Hand
+
+
 class Player:
+    __slots__ = ("name", "hands", "balance", "bets", "spare_hands", "surrendered")
+
     def __init__(self, name, initial_balance):
         # Initialize player attributes
         self.name = name
-        self.hands = [[]]  # Initialize player hands as a list of lists
+        self.hands = [Hand()]  # Initialize player hands as a list of Hand objects
         self.balance = initial_balance
         self.bets = [0]  # Initialize player bets as a list
+        self.spare_hands = []  # Cleared split hands kept for reuse in later rounds
+        self.surrendered = False
+
+    def get_hand(self, hand_index=0):
+        # Return the Hand at hand_index, wrapping plain card lists assigned from outside
+        hand = self.hands[hand_index]
+        if not isinstance(hand, Hand):
+            hand = self.hands[hand_index] = Hand(hand)
+        return hand
 
     def print_hand(self, hand_index=0):
         # Prints the hand along with its total value
         if hand_index < len(self.hands):
-            hand = self.hands[hand_index]
+            hand = self.get_hand(hand_index)
             hand_representation = ' '.join(f"{card.rank}{card.suit}" for card in hand)
-            hand_value = self.calculate_hand_value(hand_index)
-            return f"{hand_representation} (Hand Value: {hand_value})"
+            return f"{hand_representation} (Hand Value: {hand.value})"
         else:
             return "Invalid hand index"
 
@@ -27,32 +40,48 @@ class Player:
 
     def hit(self, card, hand_index=0):
         # Add a card to the player's hand
-        self.hands[hand_index].append(card)
+        self.get_hand(hand_index).append(card)
 
     def receive_hand(self, card_1, card_2):
         # Receive the initial hand of cards
-        self.hands[0].append(card_1)
-        self.hands[0].append(card_2)
+        hand = self.get_hand(0)
+        hand.append(card_1)
+        hand.append(card_2)
     
     def reset_hand(self):
-        self.hands = [[]]
+        # Clear the hands in place and keep split hands for reuse instead of allocating new ones
+        self.surrendered = False
+        hands = self.hands
+        while len(hands) > 1:
+            hand = hands.pop()
+            if isinstance(hand, Hand):
+                hand.clear()
+                self.spare_hands.append(hand)
+
+        if isinstance(hands[0], Hand):
+            hands[0].clear()
+        else:
+            hands[0] = Hand()
 
     def reset_bet(self):
-        self.bet = [0]
+        del self.bets[1:]
+        self.bets[0] = 0
 
     def split(self, hand_index=0):
-        # Perform a split if the hand can be split
+        # Perform a split if the hand can be split; the new hand's bet comes out of the balance
         if self.can_split(hand_index):
-            card_to_split = self.hands[hand_index].pop(0)
-            new_hand = [card_to_split]
+            card_to_split = self.get_hand(hand_index).pop()
+            new_hand = self.spare_hands.pop() if self.spare_hands else Hand()
+            new_hand.append(card_to_split)
             new_bet = self.bets[hand_index]
+            self.balance -= new_bet
             self.hands.append(new_hand)
             self.bets.append(new_bet)
 
     def can_split(self, hand_index=0):
-        # Check if the hand has exactly two cards of the same rank
-        return (len(self.hands[hand_index]) == 2 and 
-                self.hands[hand_index][0].rank == self.hands[hand_index][1].rank)
+        # Check if the hand has exactly two cards of the same rank and the balance covers a second bet
+        hand = self.get_hand(hand_index)
+        return len(hand) == 2 and hand[0].rank == hand[1].rank and self.balance >= self.bets[hand_index]
 
     def double_down(self, hand_index=0):
         # Double the bet on the player's hand if the balance allows
@@ -60,27 +89,14 @@ class Player:
             self.balance -= self.bets[hand_index]
             self.bets[hand_index] *= 2
             
+    def surrender(self):
+        # Give up the hand; half of the bet is returned when the round is settled
+        self.surrendered = True
+
     def can_double_down(self, hand_index=0):
         # Check if balance is enought to double down
         return self.balance >= self.bets[hand_index]
             
     def calculate_hand_value(self, hand_index=0):
-        hand_value = 0
-        aces_count = 0
-
-        for card in self.hands[hand_index]:
-            rank = card.rank
-            if rank in ["J", "Q", "K"]:
-                hand_value += 10
-            elif rank == "A":
-                aces_count += 1
-                hand_value += 11
-            else:
-                hand_value += int(rank)
-        
-        # Adjust for Aces if the hand value is over 21
-        while hand_value > 21 and aces_count > 0:
-            hand_value -= 10
-            aces_count -= 1
-        
-        return hand_value
\ No newline at end of file
+        # The hand keeps a running total, so this is a constant-time lookup
+        return self.get_hand(hand_index).value
@@ -0,0 +1,63 @@
+import sys
+
+
+class TerminalRenderer:
+    # Interactive mode: every message goes straight to the output callable (print by default)
+    def __init__(self, output=print):
+        self.output = output
+
+    def message(self, template, *args, end="\n"):
+        # Templates are only formatted here, so renderers that drop messages never pay for it
+        text = template.format(*args) if args else template
+        if end == "\n":
+            self.output(text)
+        else:
+            self.output(text, end=end)
+
+    def hand(self, player, template, hand_index=0):
+        # template receives {name} and {hand}; the hand is only formatted when it is shown
+        self.message(template.format(name=player.name, hand=player.print_hand(hand_index)))
+
+    def end_round(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+class BufferedRenderer(TerminalRenderer):
+    # Collect a round's messages and write them as one block, for output piped to files.
+    # Pending messages are also flushed before the game waits for input, so prompts stay in order.
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.parts = []
+        self.output = self.append
+
+    def append(self, text, end="\n"):
+        self.parts.append(str(text))
+        self.parts.append(end)
+
+    def end_round(self):
+        self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write("".join(self.parts))
+            self.stream.flush()
+            self.parts.clear()
+
+
+class NullRenderer:
+    # Headless mode: nothing is formatted or written
+    def message(self, template, *args, end="\n"):
+        pass
+
+    def hand(self, player, template, hand_index=0):
+        pass
+
+    def end_round(self):
+        pass
+
+    def flush(self):
+        pass
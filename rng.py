@@ -0,0 +1,87 @@
+import random
+
+# Generator names
+MT19937 = "mt19937"  # Python's random.Random
+PCG64 = "pcg64"  # NumPy's PCG64 bit generator
+DEFAULT_GENERATOR = MT19937
+
+
+class PythonRNG:
+    # Seedable wrapper around random.Random; the default generator, needs no extra packages
+    name = MT19937
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def shuffle(self, items):
+        self.random.shuffle(items)
+
+    def uniform(self):
+        return self.random.random()
+
+    def randbelow(self, n):
+        return self.random.randrange(n)
+
+    def choices(self, population, k):
+        # k independent draws with replacement
+        return self.random.choices(population, k=k)
+
+    def permutations(self, count, size):
+        # count independent orderings of range(size), one list per row
+        return [self.random.sample(range(size), size) for _ in range(count)]
+
+    def getstate(self):
+        return self.name, self.random.getstate()
+
+    def setstate(self, state):
+        self.random.setstate(state[1])
+
+
+class PCG64RNG:
+    # NumPy PCG64 generator: faster shuffles of large shoes and whole batches of shoes per call
+    name = PCG64
+
+    def __init__(self, seed=None):
+        import numpy as np  # Optional dependency, only needed when this generator is chosen
+        self.generator = np.random.Generator(np.random.PCG64(seed))
+
+    def shuffle(self, items):
+        order = self.generator.permutation(len(items)).tolist()
+        items[:] = [items[index] for index in order]
+
+    def uniform(self):
+        return self.generator.random()
+
+    def randbelow(self, n):
+        return int(self.generator.integers(n))
+
+    def choices(self, population, k):
+        return [population[index] for index in self.generator.integers(len(population), size=k).tolist()]
+
+    def permutations(self, count, size):
+        # One call for the whole batch: each row of the matrix is an independent permutation
+        import numpy as np
+        return self.generator.permuted(np.tile(np.arange(size), (count, 1)), axis=1).tolist()
+
+    def getstate(self):
+        return self.name, self.generator.bit_generator.state
+
+    def setstate(self, state):
+        self.generator.bit_generator.state = state[1]
+
+
+GENERATORS = {MT19937: PythonRNG, PCG64: PCG64RNG}
+
+
+def make_rng(seed=None, generator=DEFAULT_GENERATOR):
+    try:
+        return GENERATORS[generator](seed)
+    except KeyError:
+        raise ValueError(f"Unknown generator {generator!r}, expected one of {sorted(GENERATORS)}") from None
+
+
+def restore_rng(state):
+    # Rebuild a generator from a getstate() checkpoint; it continues exactly where the original stopped
+    rng = make_rng(generator=state[0])
+    rng.setstate(state)
+    return rng
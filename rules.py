@@ -0,0 +1,138 @@
+import math
+
+from hand import BLACKJACK_VALUE
+from host import STAND_ON_SOFT_17, HIT_ON_SOFT_17
+
+# Settlement outcomes, used to index the payout table
+LOSS = 0
+PUSH = 1
+WIN = 2
+BLACKJACK = 3
+SURRENDER = 4
+
+# Common blackjack payouts (winnings per unit bet on a two-card 21), as (numerator, denominator)
+THREE_TO_TWO = (3, 2)
+SIX_TO_FIVE = (6, 5)
+EVEN_MONEY = (1, 1)
+DEFAULT_MAX_HANDS = 2  # Split once, no resplits
+
+
+def payout_ratio(payout):
+    # Reduced (numerator, denominator) of a payout given as a pair or as any number with
+    # as_integer_ratio (int, float, Fraction). Plain integer pairs keep fractions out of the import path.
+    numerator, denominator = payout if isinstance(payout, tuple) else payout.as_integer_ratio()
+    divisor = math.gcd(numerator, denominator)
+    return numerator // divisor, denominator // divisor
+
+
+def parse_payout(text):
+    # "3:2", "6/5" or "1.5" as a (numerator, denominator) pair, for command-line options
+    for separator in (":", "/"):
+        if separator in text:
+            numerator, denominator = text.split(separator)
+            return int(numerator), int(denominator)
+    return float(text).as_integer_ratio()
+
+
+class Rules:
+    # Table rules. The defaults are the original game: the host stands on all 17s, two-card 21s
+    # are settled like any other 21 (blackjack_payout=None), one split with hit/stand only and no surrender.
+    def __init__(self, host_hits_soft_17=False, blackjack_payout=None, double_after_split=False,
+                 max_hands=DEFAULT_MAX_HANDS, surrender=False, num_decks=1):
+        self.host_hits_soft_17 = host_hits_soft_17
+        self.blackjack_payout = None if blackjack_payout is None else payout_ratio(blackjack_payout)
+        self.double_after_split = double_after_split
+        self.max_hands = max_hands  # Hands a player may hold after splitting; 1 disables splits
+        self.surrender = surrender  # Late surrender of the first two cards for half the bet
+        self.num_decks = num_decks
+
+    def key(self):
+        return (self.host_hits_soft_17, self.blackjack_payout, self.double_after_split,
+                self.max_hands, self.surrender, self.num_decks)
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (f"Rules(host_hits_soft_17={self.host_hits_soft_17}, blackjack_payout={self.blackjack_payout}, "
+                f"double_after_split={self.double_after_split}, max_hands={self.max_hands}, "
+                f"surrender={self.surrender}, num_decks={self.num_decks})")
+
+
+class CompiledRules:
+    # Rules turned into lookup tables once per game, so play and settlement index a table
+    # instead of testing each option on every hand
+    def __init__(self, rules=None):
+        rules = rules or Rules()
+        self.config = rules
+        self.num_decks = rules.num_decks
+        self.host_hit_table = HIT_ON_SOFT_17 if rules.host_hits_soft_17 else STAND_ON_SOFT_17
+        self.naturals = rules.blackjack_payout is not None
+        numerator, denominator = rules.blackjack_payout if self.naturals else EVEN_MONEY
+
+        # Amount returned per unit bet for each outcome, as (numerator, denominator) pairs
+        returns = {LOSS: (0, 1), PUSH: (1, 1), WIN: (2, 1), BLACKJACK: (numerator + denominator, denominator),
+                   SURRENDER: (1, 2)}
+        self.payouts = tuple(payout_ratio(returns[outcome]) for outcome in (LOSS, PUSH, WIN, BLACKJACK, SURRENDER))
+        # Smallest bet every reachable outcome pays in whole units. Bets must be multiples of it,
+        # so payouts stay exact integers (1 unit at 3:2 would otherwise round down to even money).
+        reachable = [LOSS, PUSH, WIN] + [BLACKJACK] * self.naturals + [SURRENDER] * rules.surrender
+        self.bet_unit = math.lcm(*(self.payouts[outcome][1] for outcome in reachable))
+
+        self.max_hands = rules.max_hands
+        self.double_after_split = rules.double_after_split
+        self.surrender = rules.surrender
+        # Whether a host two-card 21 changes settlement: it beats every hand but a natural, and under
+        # late surrender the host checks for it first, so a surrender against one loses the whole bet
+        self.host_checks_natural = self.naturals or rules.surrender
+        # Whether split hands need to be offered anything beyond hit and stand
+        self.split_hand_options = rules.double_after_split or rules.max_hands > DEFAULT_MAX_HANDS
+
+    def table_bet(self, bet, balance):
+        # A requested bet capped at the balance and rounded down to whole bet units; 0 skips the round.
+        # Policies cap their own bets, so a request of the whole balance may be off-unit (an odd balance
+        # after a 3:2 natural); only a request below the balance has to be in whole units.
+        if bet < balance and bet % self.bet_unit:
+            raise ValueError(f"Bet of {bet} is not a multiple of {self.bet_unit}, the smallest bet these rules pay exactly")
+        bet = max(0, min(bet, balance))
+        return bet - bet % self.bet_unit
+
+    def can_split(self, player, hand_index=0):
+        return len(player.hands) < self.max_hands and player.can_split(hand_index)
+
+    def can_double_down(self, player, hand_index=0):
+        if len(player.hands) > 1 and not self.double_after_split:
+            return False
+        return len(player.get_hand(hand_index)) == 2 and player.can_double_down(hand_index)
+
+    def can_surrender(self, player):
+        return self.surrender and len(player.hands) == 1 and len(player.get_hand(0)) == 2
+
+    def is_natural(self, player, hand_index=0):
+        # A two-card 21 on an unsplit hand
+        hand = player.get_hand(hand_index)
+        return hand.value == BLACKJACK_VALUE and len(hand) == 2 and len(player.hands) == 1
+
+    def outcome(self, player, hand_index, host_value, host_natural):
+        if player.surrendered:
+            return LOSS if host_natural else SURRENDER
+        value = player.calculate_hand_value(hand_index)
+        if value > BLACKJACK_VALUE:
+            return LOSS
+        if self.naturals:
+            natural = self.is_natural(player, hand_index)
+            if natural or host_natural:
+                if natural == host_natural:
+                    return PUSH
+                return BLACKJACK if natural else LOSS
+        if host_value > BLACKJACK_VALUE or value > host_value:
+            return WIN
+        return LOSS if value < host_value else PUSH
+
+    def payout(self, outcome, bet):
+        # Exact for bets in whole bet units, which table_bet guarantees
+        numerator, denominator = self.payouts[outcome]
+        return bet * numerator // denominator
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import time
+from functools import partial
+
+from blackjack import Blackjack, HIT_ACTION, STAND_ACTION
+from player import Player
+from renderer import NullRenderer
+from rules import DEFAULT_MAX_HANDS, Rules, parse_payout
+
+# Constants
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BALANCE = 1000
+DEFAULT_ACTION_TIMEOUT = 30.0  # Seconds a player has to answer a prompt
+MAX_SEATS = 6
+YES = "yes"
+NO = "no"
+
+# Protocol: the client sends "JOIN <table> <name>" and then answers every prompt with one line.
+# Prompts are "BET? <balance> <bet unit>" (bets must be multiples of the unit), "SURRENDER?",
+# "SPLIT? <hand index>", "DOUBLE? <hand index>" and "ACTION? <hand index> <hand value> <upcard>".
+# The server also sends "ROUND <n>", "RESULT <balance>", "BROKE" and "ERROR <reason>" lines.
+
+
+class Seat:
+    # A connected player: the Player object plus its connection and pending answers
+    def __init__(self, player, writer):
+        self.player = player
+        self.writer = writer
+        self.answers = asyncio.Queue()
+        self.connected = True
+
+    def send(self, line):
+        if self.connected:
+            self.writer.write(line.encode() + b"\n")
+
+
+class Table:
+    def __init__(self, server, table_id, rules=None):
+        self.server = server
+        self.table_id = table_id
+        self.game = Blackjack([], server.initial_balance, rules=rules, renderer=NullRenderer())
+        self.seats = {}  # Player -> Seat
+        self.waiting = []  # Seats that join at the start of the next round
+        self.task = None
+
+    def join(self, seat):
+        names = [player.name for player in self.seats] + [waiting.player.name for waiting in self.waiting]
+        if seat.player.name in names:
+            return "name taken"
+        if len(names) >= MAX_SEATS:
+            return "table full"
+
+        self.waiting.append(seat)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return None
+
+    async def run(self):
+        # Play rounds for as long as anybody is seated; each table runs independently
+        while True:
+            self.seat_players()
+            if not self.seats:
+                break
+            await self.play_round()
+            await asyncio.sleep(0)
+
+        del self.server.tables[self.table_id]
+
+    def seat_players(self):
+        for seat in self.waiting:
+            self.seats[seat.player] = seat
+            self.game.players.append(seat.player)
+        self.waiting.clear()
+
+        for player, seat in list(self.seats.items()):
+            if not seat.connected or not self.game.has_funds(player):
+                if not self.game.has_funds(player):
+                    seat.send("BROKE")
+                del self.seats[player]
+                self.game.players.remove(player)
+
+    async def ask(self, player, prompt, parse, default):
+        # Send a prompt and wait for a valid answer; timeouts and disconnects fall back to the default
+        seat = self.seats[player]
+        while not seat.answers.empty():
+            seat.answers.get_nowait()  # Drop answers that arrived after an earlier timeout
+        seat.send(prompt)
+
+        while seat.connected:
+            try:
+                line = await asyncio.wait_for(seat.answers.get(), self.server.action_timeout)
+            except asyncio.TimeoutError:
+                break
+            if line is None:
+                break  # Disconnected
+
+            self.server.actions += 1
+            answer = parse(line, player)
+            if answer is not None:
+                return answer
+            seat.send(prompt)
+
+        return default
+
+    async def play_round(self):
+        # Same flow as Blackjack.play_round, awaiting each decision instead of blocking on input()
+        game = self.game
+        game.round_number += 1
+        game.reset_for_new_round()
+        for seat in self.seats.values():
+            seat.send(f"ROUND {game.round_number}")
+
+        rules = game.rules
+        parse = partial(parse_bet, bet_unit=rules.bet_unit)
+        game.active_players.clear()
+        for player in game.players:
+            bet = await self.ask(player, f"BET? {player.balance} {rules.bet_unit}", parse, 0)
+            if bet > 0:
+                player.place_bet(bet)
+                game.active_players.append(player)
+
+        if not game.active_players:
+            return
+
+        game.deal_initial_cards()
+        for player in game.active_players:
+            if rules.can_surrender(player) and await self.ask(player, "SURRENDER?", parse_yes_no, False):
+                game.handle_surrender(player)
+                continue
+
+            if rules.can_split(player) and await self.ask(player, "SPLIT? 0", parse_yes_no, False):
+                game.handle_split(player)
+                # Resplits append new hands, so keep going until every hand has been played
+                hand_index = 0
+                while hand_index < len(player.hands):
+                    await self.play_hand(player, hand_index)
+                    hand_index += 1
+                continue
+
+            if rules.can_double_down(player) and await self.ask(player, "DOUBLE? 0", parse_yes_no, False):
+                game.handle_double_down(player)
+                continue
+
+            await self.play_hand(player)
+
+        game.host_turn()
+        game.update_balances()
+        for player in game.active_players:
+            self.seats[player].send(f"RESULT {player.balance}")
+
+    async def play_hand(self, player, hand_index=0):
+        game = self.game
+        upcard = game.host_upcard().value
+        while not game.is_turn_over(player, hand_index):
+            if game.rules.split_hand_options and len(player.hands) > 1 and await self.offer_split_hand_options(player, hand_index):
+                break  # Doubled down on a split hand
+            prompt = f"ACTION? {hand_index} {player.calculate_hand_value(hand_index)} {upcard}"
+            action = await self.ask(player, prompt, parse_action, STAND_ACTION)
+            if action == HIT_ACTION:
+                game.handle_hit(player, hand_index)
+            else:
+                game.handle_stand(player, hand_index)
+                break
+
+    async def offer_split_hand_options(self, player, hand_index):
+        # Same as Blackjack.offer_split_hand_options: a split hand may be resplit or doubled once its
+        # second card is in. Returns True when the hand was doubled down, which ends its turn.
+        game = self.game
+        if len(player.get_hand(hand_index)) != 2:
+            return False
+        if game.rules.can_split(player, hand_index) and await self.ask(player, f"SPLIT? {hand_index}", parse_yes_no, False):
+            game.handle_split(player, hand_index)
+            return False
+        if game.rules.can_double_down(player, hand_index) and await self.ask(player, f"DOUBLE? {hand_index}", parse_yes_no, False):
+            game.handle_double_down(player, hand_index)
+            return True
+        return False
+
+
+def parse_bet(line, player, bet_unit=1):
+    try:
+        bet = int(line)
+    except ValueError:
+        return None
+    return bet if 0 <= bet <= player.balance and bet % bet_unit == 0 else None
+
+
+def parse_yes_no(line, player):
+    answer = line.strip().lower()
+    if answer in (YES, NO):
+        return answer == YES
+    return None
+
+
+def parse_action(line, player):
+    action = line.strip().lower()
+    return action if action in (HIT_ACTION, STAND_ACTION) else None
+
+
+class BlackjackServer:
+    def __init__(self, initial_balance=DEFAULT_BALANCE, action_timeout=DEFAULT_ACTION_TIMEOUT, rules=None):
+        self.initial_balance = initial_balance
+        self.action_timeout = action_timeout
+        self.rules = rules  # Rules every table plays by
+        self.tables = {}
+        self.actions = 0  # Player answers processed, for throughput measurements
+
+    async def handle_connection(self, reader, writer):
+        line = (await reader.readline()).decode().split()
+        if len(line) != 3 or line[0] != "JOIN":
+            writer.write(b"ERROR expected JOIN <table> <name>\n")
+            writer.close()
+            return
+
+        _, table_id, name = line
+        table = self.tables.get(table_id)
+        if table is None:
+            table = self.tables[table_id] = Table(self, table_id, self.rules)
+
+        seat = Seat(Player(name, self.initial_balance), writer)
+        error = table.join(seat)
+        if error:
+            writer.write(f"ERROR {error}\n".encode())
+            writer.close()
+            return
+
+        # Feed answers to the table until the client goes away
+        try:
+            while True:
+                data = await reader.readline()
+                if not data:
+                    break
+                seat.answers.put_nowait(data.decode().strip())
+        except ConnectionError:
+            pass
+
+        seat.connected = False
+        seat.answers.put_nowait(None)
+        writer.close()
+
+    async def report(self, interval):
+        # Print server-side throughput every interval seconds
+        last_actions, last_time = self.actions, time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            rate = (self.actions - last_actions) / (now - last_time)
+            tables = sum(1 for table in self.tables.values() if table.seats)
+            print(f"{tables} active tables, {rate:.0f} actions/s")
+            last_actions, last_time = self.actions, now
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, report_interval=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if report_interval:
+            asyncio.create_task(self.report(report_interval))
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many Blackjack tables over a local TCP line protocol.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--balance", type=int, default=DEFAULT_BALANCE, help="initial balance for new players")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_ACTION_TIMEOUT, help="seconds allowed per action")
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between throughput reports")
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--h17", action="store_true", help="host hits soft 17")
+    parser.add_argument("--blackjack-payout", type=parse_payout, help="pay naturals at this ratio, e.g. 3:2 or 6:5")
+    parser.add_argument("--das", action="store_true", help="allow doubling after a split")
+    parser.add_argument("--max-hands", type=int, default=DEFAULT_MAX_HANDS, help="hands a player may hold after splitting")
+    parser.add_argument("--surrender", action="store_true", help="allow late surrender")
+    args = parser.parse_args()
+
+    rules = Rules(host_hits_soft_17=args.h17, blackjack_payout=args.blackjack_payout, double_after_split=args.das,
+                  max_hands=args.max_hands, surrender=args.surrender, num_decks=args.decks)
+    server = BlackjackServer(args.balance, args.timeout, rules)
+    asyncio.run(server.serve(args.host, args.port, args.report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+from bisect import bisect
+from itertools import accumulate
+
+from blackjack import Blackjack, HIT_ACTION, STAND_ACTION
+from dealer_odds import HOST_OUTCOME_TOTALS, HOST_OUTCOMES, NATURAL, infinite_deck_table
+from deck import DEFAULT_PENETRATION, InfiniteDeck
+from renderer import NullRenderer
+from rng import DEFAULT_GENERATOR
+from strategy import DOUBLE, HIT, SPLIT
+from tracker import ShoeTracker
+
+# Constants
+DEFAULT_BET = None  # One table bet unit: 1 at even money, 2 at 3:2 or with surrender, 5 at 6:5
+DEFAULT_STAND_VALUE = 17
+DEFAULT_MAX_SPREAD = 8
+# Host total and natural flag for every HOST_OUTCOMES entry
+HOST_RESULTS = [(total, outcome == NATURAL) for total, outcome in zip(HOST_OUTCOME_TOTALS, HOST_OUTCOMES)]
+
+
+class Policy:
+    # Default decision policy: flat bet, never split or double down, hit like the host
+    def __init__(self, bet_amount=DEFAULT_BET, stand_value=DEFAULT_STAND_VALUE):
+        self.bet_amount = bet_amount
+        self.stand_value = stand_value
+
+    def bet(self, game, player):
+        return min(self.bet_size(game), player.balance)
+
+    def bet_size(self, game):
+        # The flat bet, by default the smallest bet the table's payouts settle exactly
+        return game.rules.bet_unit if self.bet_amount is None else self.bet_amount
+
+    def action(self, game, player, hand_index=0):
+        if player.calculate_hand_value(hand_index) < self.stand_value:
+            return HIT_ACTION
+        return STAND_ACTION
+
+    def split(self, game, player, hand_index=0):
+        return False
+
+    def double_down(self, game, player, hand_index=0):
+        return False
+
+    def surrender(self, game, player):
+        return False
+
+
+class BasicStrategyPolicy(Policy):
+    # Flat bet and play every decision from a StrategyTable
+    def __init__(self, table, bet_amount=DEFAULT_BET):
+        super().__init__(bet_amount)
+        self.table = table
+
+    def decide(self, game, player, hand_index=0, can_double=False, can_split=False):
+        return self.table.decide(player.get_hand(hand_index), game.host_upcard().value, can_double, can_split)
+
+    def action(self, game, player, hand_index=0):
+        if self.decide(game, player, hand_index) == HIT:
+            return HIT_ACTION
+        return STAND_ACTION
+
+    def split(self, game, player, hand_index=0):
+        can_double = game.rules.can_double_down(player, hand_index)
+        return self.decide(game, player, hand_index, can_double, can_split=True) == SPLIT
+
+    def double_down(self, game, player, hand_index=0):
+        return self.decide(game, player, hand_index, can_double=True) == DOUBLE
+
+
+class CountingBetPolicy(Policy):
+    # Spread bets with the Hi-Lo true count and delegate playing decisions to another policy
+    def __init__(self, play_policy, bet_amount=DEFAULT_BET, max_spread=DEFAULT_MAX_SPREAD):
+        super().__init__(bet_amount)
+        self.play_policy = play_policy
+        self.max_spread = max_spread
+
+    def bet(self, game, player):
+        tracker = game.deck.tracker
+        if tracker is None:
+            tracker = ShoeTracker().attach(game.deck)
+        # One unit at a true count of 1 or less, then one more unit per point, up to max_spread
+        units = min(self.max_spread, max(1, int(tracker.true_count)))
+        return min(self.bet_size(game) * units, player.balance)
+
+    def action(self, game, player, hand_index=0):
+        return self.play_policy.action(game, player, hand_index)
+
+    def split(self, game, player, hand_index=0):
+        return self.play_policy.split(game, player, hand_index)
+
+    def double_down(self, game, player, hand_index=0):
+        return self.play_policy.double_down(game, player, hand_index)
+
+    def surrender(self, game, player):
+        return self.play_policy.surrender(game, player)
+
+
+class PlayerStats:
+    def __init__(self, name, initial_balance):
+        # Aggregate results for a single seat
+        self.name = name
+        self.initial_balance = initial_balance
+        self.rounds = 0
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+        self.wagered = 0
+        self.net = 0
+        self.trajectory = []  # Balance after every sampled round
+
+    def record(self, wagered, net):
+        self.rounds += 1
+        self.wagered += wagered
+        self.net += net
+        if net > 0:
+            self.wins += 1
+        elif net < 0:
+            self.losses += 1
+        else:
+            self.pushes += 1
+
+    def merge(self, other):
+        # Append another session's results, shifting its trajectory to continue from this one
+        offset = self.net
+        self.rounds += other.rounds
+        self.wins += other.wins
+        self.losses += other.losses
+        self.pushes += other.pushes
+        self.wagered += other.wagered
+        self.net += other.net
+        self.trajectory.extend(balance + offset for balance in other.trajectory)
+
+    @property
+    def ev_per_round(self):
+        # Average net result per round played
+        return self.net / self.rounds if self.rounds else 0.0
+
+    @property
+    def ev_per_unit(self):
+        # Average net result per unit wagered (negative values are the house edge)
+        return self.net / self.wagered if self.wagered else 0.0
+
+
+class SimulationResult:
+    def __init__(self, player_names, initial_balance):
+        self.rounds = 0
+        self.players = {name: PlayerStats(name, initial_balance) for name in player_names}
+
+    def merge(self, other):
+        # Combine results from another (independent) session into this one
+        self.rounds += other.rounds
+        for name, stats in other.players.items():
+            self.players[name].merge(stats)
+        return self
+
+    def summary(self):
+        # Return a human readable summary, one line per player
+        lines = [f"Rounds: {self.rounds}"]
+        for stats in self.players.values():
+            lines.append(
+                f"{stats.name}: W {stats.wins} / L {stats.losses} / P {stats.pushes}, "
+                f"net {stats.net}, EV/round {stats.ev_per_round:.5f}, EV/unit {stats.ev_per_unit:.5f}"
+            )
+        return "\n".join(lines)
+
+
+class HeadlessBlackjack(Blackjack):
+    def __init__(self, player_names, initial_balance, policies, seed=None,
+                 num_decks=1, penetration=DEFAULT_PENETRATION, event_log=None, store=None, rules=None,
+                 generator=DEFAULT_GENERATOR, renderer=None):
+        # Rounds are not rendered unless a renderer is given
+        super().__init__(player_names, initial_balance, seed=seed, num_decks=num_decks,
+                         penetration=penetration, event_log=event_log, store=store, rules=rules,
+                         generator=generator, renderer=renderer or NullRenderer())
+        # Accept a single policy shared by every seat or a dict of policies by player name
+        if isinstance(policies, dict):
+            self.policies = policies
+        else:
+            self.policies = {name: policies for name in player_names}
+        # Reused every round to avoid per-round allocations
+        self.round_start_balances = {}
+        self.outcome = {}
+
+    def ask_for_bet(self, player):
+        return self.rules.table_bet(self.policies[player.name].bet(self, player), player.balance)
+
+    def get_player_action(self, player, hand_index=0):
+        return self.policies[player.name].action(self, player, hand_index)
+
+    def offer_split(self, player, hand_index=0):
+        if self.policies[player.name].split(self, player, hand_index):
+            self.handle_split(player, hand_index)
+            return True
+        return False
+
+    def offer_double_down(self, player, hand_index=0):
+        if self.policies[player.name].double_down(self, player, hand_index):
+            self.handle_double_down(player, hand_index)
+            return True
+        return False
+
+    def offer_surrender(self, player):
+        if self.policies[player.name].surrender(self, player):
+            self.handle_surrender(player)
+            return True
+        return False
+
+    def update_balances(self):
+        self.settle(self.host.calculate_hand_value(), self.rules.host_checks_natural and self.rules.is_natural(self.host))
+
+    def settle(self, host_value, host_natural):
+        # Same settlement as Blackjack.update_balances without formatting a message per hand
+        rules = self.rules
+        event_log = self.event_log
+
+        for player in self.active_players:
+            for hand_index, bet in enumerate(player.bets):
+                payout = rules.payout(rules.outcome(player, hand_index, host_value, host_natural), bet)
+                player.balance += payout
+                if event_log is not None:
+                    event_log.settle(player, hand_index, payout)
+
+    def play_headless_round(self):
+        # Play one round without prompts and return {player: (wagered, net)} for active players.
+        # The returned dict is reused, so read it before playing the next round.
+        if not self.start_headless_round():
+            return None
+
+        if self.handle_bets():
+            self.deal_initial_cards()
+            self.play_round()
+            self.finish_play()
+        return self.finish_headless_round()
+
+    def start_headless_round(self):
+        # Returns False when nobody has funds left
+        self.remove_players_without_funds()
+        if not self.players:
+            return False
+
+        self.round_number += 1
+        balances = self.round_start_balances
+        balances.clear()
+        for player in self.players:
+            balances[player] = player.balance
+        self.reset_for_new_round()
+        self.outcome.clear()
+        return True
+
+    def finish_play(self):
+        # Settle a round in which somebody placed a bet (the host has already played)
+        self.update_balances()
+        if self.store is not None:
+            self.store.record_round(self)
+
+    def finish_headless_round(self):
+        self.renderer.end_round()
+        outcome = self.outcome
+        balances = self.round_start_balances
+        for player in self.active_players:
+            outcome[player] = (sum(player.bets), player.balance - balances[player])
+        return outcome
+
+
+class InfiniteDeckBlackjack(HeadlessBlackjack):
+    # Headless game with an infinite deck. The host's hand is never played out: its result is drawn
+    # from the exact outcome table for its upcard, so the host's turn costs one table lookup.
+    # Host draws are not written to the event log.
+    def __init__(self, player_names, initial_balance, policies, seed=None, event_log=None, store=None,
+                 rules=None, generator=DEFAULT_GENERATOR):
+        super().__init__(player_names, initial_balance, policies, seed, event_log=event_log, store=store,
+                         rules=rules, generator=generator)
+        self.deck = InfiniteDeck(seed, generator=generator)
+        table = infinite_deck_table(self.rules.config.host_hits_soft_17)
+        self.host_table = {upcard: list(accumulate(row)) for upcard, row in table.items()}
+        self.host_result = HOST_RESULTS[0]
+
+    def host_turn(self):
+        cumulative = self.host_table[self.host_upcard().value]
+        outcome = bisect(cumulative, self.deck.rng.uniform())
+        self.host_result = HOST_RESULTS[min(outcome, len(HOST_RESULTS) - 1)]  # Guard against rounding at 1.0
+
+    def update_balances(self):
+        host_value, host_natural = self.host_result
+        self.settle(host_value, self.rules.host_checks_natural and host_natural)
+
+
+def simulate(player_names, initial_balance, rounds, policies=None, trajectory_every=1, seed=None,
+             num_decks=1, penetration=DEFAULT_PENETRATION, rules=None, generator=DEFAULT_GENERATOR):
+    # Play up to `rounds` rounds headlessly and return the aggregated SimulationResult
+    game = HeadlessBlackjack(player_names, initial_balance, policies or Policy(), seed, num_decks, penetration,
+                             rules=rules, generator=generator)
+    result = SimulationResult(player_names, initial_balance)
+    return run_rounds(game, result, rounds, trajectory_every)
+
+
+def run_rounds(game, result, rounds, trajectory_every=1):
+    for _ in range(rounds):
+        outcome = game.play_headless_round()
+        if outcome is None:
+            break  # Nobody has funds left
+
+        result.rounds += 1
+        for player, (wagered, net) in outcome.items():
+            result.players[player.name].record(wagered, net)
+
+        if trajectory_every and result.rounds % trajectory_every == 0:
+            for player in game.players:
+                result.players[player.name].trajectory.append(player.balance)
+
+    return result
+
+
+if __name__ == "__main__":
+    print(simulate(["Player 1", "Player 2"], 10 ** 9, 100000, trajectory_every=0).summary())
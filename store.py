@@ -0,0 +1,132 @@
+import sqlite3
+import time
+
+# Constants
+DEFAULT_BATCH_ROUNDS = 100  # Rounds buffered in memory before one write transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL,
+    rounds INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    pushes INTEGER NOT NULL DEFAULT 0,
+    wagered INTEGER NOT NULL DEFAULT 0,
+    net INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    rounds INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    session_id INTEGER NOT NULL,
+    round_number INTEGER NOT NULL,
+    player_name TEXT NOT NULL,
+    wagered INTEGER NOT NULL,
+    net INTEGER NOT NULL,
+    balance INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_by_player ON rounds (player_name);
+"""
+
+UPSERT_PLAYER = """
+INSERT INTO players (name, balance, rounds, wins, losses, pushes, wagered, net)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    balance = excluded.balance,
+    rounds = rounds + excluded.rounds,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    pushes = pushes + excluded.pushes,
+    wagered = wagered + excluded.wagered,
+    net = net + excluded.net
+"""
+
+
+class BankrollStore:
+    # SQLite store for balances, per-player stats and round history, written in batches
+    def __init__(self, path, batch_rounds=DEFAULT_BATCH_ROUNDS):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.batch_rounds = batch_rounds
+        self.balances = {}  # Last known balance per player name
+        self.pending_players = {}  # name -> [balance, rounds, wins, losses, pushes, wagered, net]
+        self.pending_rounds = []
+        self.pending_count = 0
+        self.session_rounds = 0
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO sessions (started_at) VALUES (?)", (time.time(),))
+        self.session_id = cursor.lastrowid
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load_balance(self, name, default):
+        # Keyed lookup on the players primary key
+        row = self.connection.execute("SELECT balance FROM players WHERE name = ?", (name,)).fetchone()
+        balance = default if row is None else row[0]
+        self.balances[name] = balance
+        return balance
+
+    def load_balances(self, names, default):
+        return {name: self.load_balance(name, default) for name in names}
+
+    def record_round(self, game):
+        # Queue the results of the round just settled; the net result is measured
+        # against the balance this store last saw for each player
+        for player in game.active_players:
+            previous = self.balances.get(player.name, player.balance)
+            net = player.balance - previous
+            wagered = sum(player.bets)
+            self.balances[player.name] = player.balance
+
+            stats = self.pending_players.setdefault(player.name, [0, 0, 0, 0, 0, 0, 0])
+            stats[0] = player.balance
+            stats[1] += 1
+            stats[2 if net > 0 else 3 if net < 0 else 4] += 1
+            stats[5] += wagered
+            stats[6] += net
+            self.pending_rounds.append(
+                (self.session_id, game.round_number, player.name, wagered, net, player.balance)
+            )
+
+        self.pending_count += 1
+        if self.pending_count >= self.batch_rounds:
+            self.flush()
+
+    def flush(self):
+        # Write every queued round in a single transaction
+        if not self.pending_count:
+            return
+
+        self.session_rounds += self.pending_count
+        with self.connection:
+            self.connection.executemany(
+                UPSERT_PLAYER, [(name, *stats) for name, stats in self.pending_players.items()]
+            )
+            self.connection.executemany("INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?)", self.pending_rounds)
+            self.connection.execute(
+                "UPDATE sessions SET rounds = ? WHERE id = ?", (self.session_rounds, self.session_id)
+            )
+        self.pending_players.clear()
+        self.pending_rounds.clear()
+        self.pending_count = 0
+
+    def player_stats(self, name):
+        row = self.connection.execute(
+            "SELECT balance, rounds, wins, losses, pushes, wagered, net FROM players WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("balance", "rounds", "wins", "losses", "pushes", "wagered", "net"), row))
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,211 @@
+import mmap
+import os
+import struct
+
+from dealer_odds import CARD_VALUES, DEALER_OUTCOMES, dealer_probabilities, full_shoe, remove_card
+from deck import ACE_VALUE
+from hand import BLACKJACK_VALUE, SOFT_ACE_ADJUSTMENT
+from host import HOST_STAND_VALUE
+
+# Table entries
+HIT = 0
+STAND = 1
+DOUBLE_OR_HIT = 2  # Double down when allowed, otherwise hit
+DOUBLE_OR_STAND = 3  # Double down when allowed, otherwise stand
+SPLIT = 4
+NO_SPLIT = 5
+DOUBLE = 6  # Only returned by StrategyTable.decide, never stored
+ACTION_NAMES = {HIT: "hit", STAND: "stand", DOUBLE: "double down", SPLIT: "split"}
+
+# Table layout: one row per player hand, one column per host upcard (2..Ace)
+HARD_TOTALS = range(2, BLACKJACK_VALUE + 1)  # Includes single cards left after a split
+SOFT_TOTALS = range(ACE_VALUE, BLACKJACK_VALUE + 1)
+PAIR_VALUES = CARD_VALUES
+HARD_OFFSET = 0
+SOFT_OFFSET = HARD_OFFSET + len(HARD_TOTALS)
+PAIR_OFFSET = SOFT_OFFSET + len(SOFT_TOTALS)
+NUM_ROWS = PAIR_OFFSET + len(PAIR_VALUES)
+NUM_COLUMNS = len(CARD_VALUES)
+
+MAGIC = b"BJST"
+HEADER = struct.Struct("<4sBB")  # magic, rows, columns
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+
+def hard_row(total):
+    return HARD_OFFSET + total - HARD_TOTALS[0]
+
+
+def soft_row(total):
+    return SOFT_OFFSET + total - SOFT_TOTALS[0]
+
+
+def pair_row(value):
+    return PAIR_OFFSET + value - PAIR_VALUES[0]
+
+
+def add_card(total, soft, value):
+    # Same Ace handling as Hand.append for a hand with at most one soft Ace
+    total += value
+    soft_aces = soft + (value == ACE_VALUE)
+    if total > BLACKJACK_VALUE and soft_aces:
+        total -= SOFT_ACE_ADJUSTMENT
+        soft_aces -= 1
+    return total, soft_aces > 0
+
+
+class HandEvaluator:
+    # EV per unit bet of each decision against one host upcard, using the game's rules:
+    # stand on 17 host, even-money wins, ties push, one card after a double, split hands hit or stand only.
+    # Player draws use the shoe's card frequencies without removing the player's own cards.
+    def __init__(self, composition, upcard):
+        remaining = sum(composition)
+        self.probabilities = [(value, count / remaining) for value, count in zip(CARD_VALUES, composition) if count]
+        dealer = dealer_probabilities(remove_card(composition, upcard), upcard)
+        self.dealer = [dealer[total] for total in DEALER_OUTCOMES[:-1]]
+        self.dealer_bust = dealer[DEALER_OUTCOMES[-1]]
+        self.best_cache = {}
+
+    def stand(self, total):
+        if total > BLACKJACK_VALUE:
+            return -1.0
+        ev = self.dealer_bust
+        for dealer_total, probability in zip(DEALER_OUTCOMES, self.dealer):
+            if total > dealer_total:
+                ev += probability
+            elif total < dealer_total:
+                ev -= probability
+        return ev
+
+    def hit(self, total, soft):
+        ev = 0.0
+        for value, probability in self.probabilities:
+            ev += probability * self.best(*add_card(total, soft, value))
+        return ev
+
+    def best(self, total, soft):
+        # Value of playing on with hit/stand only
+        if total > BLACKJACK_VALUE:
+            return -1.0
+        if total == BLACKJACK_VALUE:
+            return self.stand(total)  # The turn ends automatically on 21
+        key = (total, soft)
+        if key not in self.best_cache:
+            self.best_cache[key] = max(self.stand(total), self.hit(total, soft))
+        return self.best_cache[key]
+
+    def double(self, total, soft):
+        ev = 0.0
+        for value, probability in self.probabilities:
+            ev += probability * self.stand(add_card(total, soft, value)[0])
+        return 2 * ev
+
+    def split(self, value):
+        # Both hands start from one card and are played with hit/stand only
+        return 2 * self.best(value, value == ACE_VALUE)
+
+    def decision(self, total, soft):
+        stand = self.stand(total)
+        if total >= BLACKJACK_VALUE:
+            return STAND
+        hit = self.hit(total, soft)
+        if self.double(total, soft) > max(hit, stand):
+            return DOUBLE_OR_HIT if hit > stand else DOUBLE_OR_STAND
+        return HIT if hit > stand else STAND
+
+    def pair_decision(self, value):
+        total, soft = add_card(value, value == ACE_VALUE, value)
+        keep = max(self.best(total, soft), self.double(total, soft))
+        return SPLIT if self.split(value) > keep else NO_SPLIT
+
+
+def build_strategy(composition):
+    # Compute the decision table for a shoe composition (counts by value, see dealer_odds)
+    table = bytearray(NUM_ROWS * NUM_COLUMNS)
+    for column, upcard in enumerate(CARD_VALUES):
+        evaluator = HandEvaluator(composition, upcard)
+        for total in HARD_TOTALS:
+            table[hard_row(total) * NUM_COLUMNS + column] = evaluator.decision(total, False)
+        for total in SOFT_TOTALS:
+            table[soft_row(total) * NUM_COLUMNS + column] = evaluator.decision(total, True)
+        for value in PAIR_VALUES:
+            table[pair_row(value) * NUM_COLUMNS + column] = evaluator.pair_decision(value)
+    return StrategyTable(bytes(table))
+
+
+class StrategyTable:
+    def __init__(self, data, offset=0):
+        # data is any bytes-like object (bytes or a memory map); decisions start at offset
+        self.data = data
+        self.offset = offset
+
+    def __reduce__(self):
+        # Memory maps cannot be pickled, so ship the raw decisions to worker processes
+        return StrategyTable, (bytes(self.data[self.offset:self.offset + NUM_ROWS * NUM_COLUMNS]),)
+
+    def entry(self, row, upcard):
+        return self.data[self.offset + row * NUM_COLUMNS + upcard - CARD_VALUES[0]]
+
+    def decide(self, hand, upcard, can_double=False, can_split=False):
+        # Return HIT, STAND, DOUBLE or SPLIT for a Hand against the host's upcard value
+        if can_split and self.entry(pair_row(hand[0].value), upcard) == SPLIT:
+            return SPLIT
+        row = soft_row(hand.value) if hand.is_soft else hard_row(hand.value)
+        entry = self.entry(row, upcard)
+        if entry in (DOUBLE_OR_HIT, DOUBLE_OR_STAND):
+            if can_double:
+                return DOUBLE
+            return HIT if entry == DOUBLE_OR_HIT else STAND
+        return entry
+
+    def hint(self, hand, upcard, can_double=False, can_split=False):
+        return ACTION_NAMES[self.decide(hand, upcard, can_double, can_split)]
+
+    def save(self, path):
+        # Write to a temporary file first so readers never see a partial table
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, NUM_ROWS, NUM_COLUMNS))
+            file.write(self.data[self.offset:self.offset + NUM_ROWS * NUM_COLUMNS])
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        # Memory-map a saved table; lookups read straight from the mapped file
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, columns = HEADER.unpack_from(data)
+        if magic != MAGIC or rows != NUM_ROWS or columns != NUM_COLUMNS:
+            raise ValueError(f"{path} is not a strategy table for this version")
+        return cls(data, HEADER.size)
+
+
+def cache_path(composition, cache_dir=DEFAULT_CACHE_DIR):
+    import hashlib  # Imported here so games that never touch the strategy cache do not pay for loading it
+
+    key = hashlib.sha1(repr((HOST_STAND_VALUE, tuple(composition))).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"strategy_{key}.bin")
+
+
+def load_strategy(composition, cache_dir=DEFAULT_CACHE_DIR):
+    # Load the table for a composition from the on-disk cache, computing it on first use
+    path = cache_path(composition, cache_dir)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_strategy(composition).save(path)
+    return StrategyTable.load(path)
+
+
+def basic_strategy(num_decks=1, cache_dir=DEFAULT_CACHE_DIR):
+    return load_strategy(full_shoe(num_decks), cache_dir)
+
+
+if __name__ == "__main__":
+    symbols = {HIT: "H", STAND: "S", DOUBLE_OR_HIT: "Dh", DOUBLE_OR_STAND: "Ds", SPLIT: "P", NO_SPLIT: "-"}
+    table = basic_strategy(6)
+    print("      " + " ".join(f"{'A' if upcard == ACE_VALUE else upcard:>3}" for upcard in CARD_VALUES))
+    rows = [(f"H{total}", hard_row(total)) for total in range(5, BLACKJACK_VALUE)]
+    rows += [(f"S{total}", soft_row(total)) for total in range(13, BLACKJACK_VALUE)]
+    rows += [(f"P{value}", pair_row(value)) for value in PAIR_VALUES]
+    for label, row in rows:
+        print(f"{label:>5} " + " ".join(f"{symbols[table.entry(row, upcard)]:>3}" for upcard in CARD_VALUES))
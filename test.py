@@ -1,6 +1,12 @@
+import importlib.util
+import os
+import tempfile
 import unittest
-from blackjack import Blackjack
+from blackjack import Blackjack, STAND_ACTION
 from deck import Deck, Card
+from simulation import simulate, Policy
+from parallel import simulate_parallel
+from hand import Hand
 
 class TestDeck(unittest.TestCase):
     def setUp(self):
@@ -17,6 +23,73 @@ class TestDeck(unittest.TestCase):
         # Ensure the deck is shuffled by checking that the order has changed
         self.assertNotEqual(original_deck, self.deck.deck, "Deck should be shuffled")
 
+class TestHand(unittest.TestCase):
+    def test_running_total_with_aces(self):
+        hand = Hand([Card('♠', 'A'), Card('♥', '6')])
+        self.assertEqual((hand.value, hand.is_soft), (17, True), "A-6 should be a soft 17")
+        hand.append(Card('♦', 'K'))
+        self.assertEqual((hand.value, hand.is_soft), (17, False), "Adding a King should make it a hard 17")
+        hand.append(Card('♣', 'A'))
+        self.assertEqual(hand.value, 18, "Second Ace should count as 1")
+
+    def test_split_keeps_totals(self):
+        game = Blackjack(["Alice"], 1000)
+        player = game.players[0]
+        player.hands = [[Card('♠', '8'), Card('♥', '8')]]
+        player.bets = [10]
+        player.split()
+        self.assertEqual([player.calculate_hand_value(i) for i in range(2)], [8, 8], "Each split hand should hold one 8")
+
+class TestShoe(unittest.TestCase):
+    def test_multi_deck_shoe(self):
+        shoe = Deck(1, num_decks=6, penetration=0.5)
+        self.assertEqual(len(shoe.deck), 312, "A 6-deck shoe should hold 312 cards")
+        shoe.position = 155
+        self.assertFalse(shoe.needs_shuffle(), "Shoe should not reshuffle before the cut card")
+        shoe.deal()
+        self.assertTrue(shoe.needs_shuffle(), "Shoe should reshuffle once the cut card is reached")
+
+    def test_round_reset_keeps_shoe_until_cut_card(self):
+        game = Blackjack(["Alfredo"], 1000, output=lambda *args, **kwargs: None, seed=1)
+        game.deck.hit()
+        game.reset_for_new_round()
+        self.assertEqual(game.deck.remaining(), 51, "Dealt cards should stay out until the cut card")
+        game.deck.position = game.deck.cut_card
+        game.reset_for_new_round()
+        self.assertEqual(game.deck.remaining(), 52, "Shoe should be reshuffled after the cut card")
+
+class TestRNG(unittest.TestCase):
+    def generators(self):
+        from rng import MT19937, PCG64
+        return [MT19937, PCG64] if HAS_NUMPY else [MT19937]
+
+    def test_checkpoint_resumes_dealing(self):
+        for generator in self.generators():
+            deck = Deck(11, 2, generator=generator)
+            for _ in range(30):
+                deck.hit()
+            state = deck.getstate()
+            expected = [deck.hit() for _ in range(20)]
+            deck.shuffle()
+            expected += deck.cards
+
+            restored = Deck(0, generator=generator)
+            restored.setstate(state)
+            dealt = [restored.hit() for _ in range(20)]
+            restored.shuffle()
+            self.assertEqual(dealt + restored.cards, expected, f"{generator} deck should resume exactly from its checkpoint")
+
+    def test_bulk_shuffle(self):
+        from collections import Counter
+        from deck import shuffle_decks
+        from rng import make_rng
+        for generator in self.generators():
+            decks = [Deck(generator=generator, num_decks=2) for _ in range(5)]
+            shuffle_decks(decks, make_rng(4, generator))
+            self.assertEqual(len({tuple(deck.cards) for deck in decks}), 5, "Every shoe should get its own order")
+            for deck in decks:
+                self.assertEqual(Counter(deck.cards), Counter(deck.shoe), "A shuffled shoe should keep every card")
+
 class TestDealCards(unittest.TestCase):
     def setUp(self):
         self.game = Blackjack(["Alfredo"], 1000)
@@ -85,6 +158,16 @@ class TestSplit(unittest.TestCase):
         self.assertEqual(self.player.bets[0], 100, "First hand bet should remain 100 after splitting")
         self.assertEqual(self.player.bets[0], 100, "Second hand bet should be 100 after splitting")
 
+    def test_split_hands_are_settled(self):
+        self.player.balance -= 100
+        self.player.split()
+        self.assertEqual(self.player.balance, 800, "Splitting should take the second bet from the balance")
+        self.player.hit(Card("♦", "9"), 0)
+        self.player.hit(Card("♣", "5"), 1)
+        self.game.host.hands[0] = [Card("♠", "10"), Card("♥", "8")]
+        self.game.update_balances()
+        self.assertEqual(self.player.balance, 1000, "The winning hand should pay and the losing hand should not")
+
 class TestDoubleDown(unittest.TestCase):
     def setUp(self):
         self.game = Blackjack(["Alfredo"], 1000)
@@ -159,6 +242,754 @@ class TestGameOutcomes(unittest.TestCase):
         self.game.update_balances()
         self.assertEqual(self.player.balance, self.initial_balance + self.bet_amount, "Player's balance should increase by the bet amount in case of a tie")
 
+class TestSimulation(unittest.TestCase):
+    def test_counts_add_up(self):
+        result = simulate(["Alfredo", "Alice"], 1000, 200)
+        self.assertEqual(result.rounds, 200, "Every round should be played while players have funds")
+        for stats in result.players.values():
+            self.assertEqual(stats.wins + stats.losses + stats.pushes, stats.rounds, "Every round should be a win, loss or push")
+            self.assertEqual(stats.trajectory[-1], 1000 + stats.net, "Final balance should match the accumulated net result")
+
+    def test_policy_decisions_are_used(self):
+        class AlwaysStand(Policy):
+            def action(self, game, player, hand_index=0):
+                self.calls = getattr(self, "calls", 0) + 1
+                return STAND_ACTION
+
+        policy = AlwaysStand(bet_amount=5)
+        result = simulate(["Alfredo"], 1000, 50, policy)
+        self.assertGreater(policy.calls, 0, "Policy should be asked for player actions")
+        self.assertEqual(result.players["Alfredo"].wagered, 5 * result.players["Alfredo"].rounds, "Flat bets should be wagered every round")
+
+    def test_infinite_deck_game(self):
+        from simulation import InfiniteDeckBlackjack, SimulationResult, run_rounds
+        game = InfiniteDeckBlackjack(["Alfredo", "Alice"], 10 ** 6, Policy(), seed=4)
+        result = run_rounds(game, SimulationResult(["Alfredo", "Alice"], 10 ** 6), 2000, trajectory_every=0)
+        for stats in result.players.values():
+            self.assertEqual(stats.wins + stats.losses + stats.pushes, 2000, "Every round should be settled")
+            self.assertLess(stats.net, 0, "Mimicking the host should lose over many rounds")
+
+class TestParallelSimulation(unittest.TestCase):
+    def test_seeded_deck_is_reproducible(self):
+        self.assertEqual(Deck(7).deck, Deck(7).deck, "Decks with the same seed should be shuffled identically")
+
+    def test_result_independent_of_workers(self):
+        serial = simulate_parallel(["Alfredo", "Alice"], 10 ** 6, 900, seed=3, workers=1, shard_rounds=100)
+        pooled = simulate_parallel(["Alfredo", "Alice"], 10 ** 6, 900, seed=3, workers=3, shard_rounds=100)
+        self.assertEqual(serial.rounds, 900, "All shards should be played")
+        for name in serial.players:
+            a, b = serial.players[name], pooled.players[name]
+            self.assertEqual((a.wins, a.losses, a.pushes, a.net), (b.wins, b.losses, b.pushes, b.net),
+                             "Merged statistics should not depend on the number of workers")
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is required for the vectorized engine")
+class TestVectorized(unittest.TestCase):
+    def test_batch_settlement_matches_game(self):
+        import numpy as np
+        from rules import Rules, THREE_TO_TWO
+        from simulation import HeadlessBlackjack
+        from vectorized import balance_deltas
+
+        class SplitAndSurrender(Policy):
+            def split(self, game, player, hand_index=0):
+                return True
+
+            def surrender(self, game, player):
+                return player.calculate_hand_value() == 16
+
+        rules = Rules(blackjack_payout=THREE_TO_TWO, max_hands=4, surrender=True)
+        game = HeadlessBlackjack(["Alfredo", "Alice", "Bob"], 10 ** 6, SplitAndSurrender(bet_amount=4), seed=2, rules=rules)
+        for _ in range(300):
+            outcome = game.play_headless_round()
+            hands = [(seat, player, hand_index) for seat, player in enumerate(game.active_players)
+                     for hand_index in range(len(player.hands))]
+            host_value = game.host.calculate_hand_value()
+            host_natural = game.rules.is_natural(game.host)
+            deltas = balance_deltas(
+                game.rules, np.array([seat for seat, _, _ in hands]), len(game.active_players),
+                np.array([player.bets[index] for _, player, index in hands]),
+                np.array([player.calculate_hand_value(index) for _, player, index in hands]),
+                np.full(len(hands), host_value),
+                np.array([game.rules.is_natural(player, index) for _, player, index in hands], dtype=bool),
+                np.full(len(hands), host_natural),
+                np.array([player.surrendered for _, player, _ in hands], dtype=bool),
+            )
+            self.assertEqual(deltas.tolist(), [outcome[player][1] for player in game.active_players],
+                             "Batch settlement should match the game's settlement for every hand")
+
+
+    def test_sampled_host_outcomes(self):
+        import numpy as np
+        from dealer_odds import infinite_deck_probabilities
+        from vectorized import sample_host_outcomes
+        upcards = np.full(200000, 10, dtype=np.int16)
+        totals, naturals = sample_host_outcomes(upcards, np.random.default_rng(3))
+        self.assertAlmostEqual((totals > 21).mean(), infinite_deck_probabilities(10)["bust"], places=2, msg="Sampled busts should follow the table")
+        self.assertAlmostEqual(naturals.mean(), 1 / 13, places=2, msg="A ten shows a natural when the hole card is an Ace")
+
+    def test_dealer_outcomes(self):
+        from vectorized import dealer_outcomes
+        outcomes = dealer_outcomes(20000, seed=1)
+        for upcard, distribution in outcomes.items():
+            self.assertAlmostEqual(sum(distribution.values()), 1.0, msg="Outcome probabilities should sum to 1")
+        self.assertGreater(outcomes[6]["bust"], outcomes[10]["bust"], "Host should bust more often showing a 6 than a 10")
+
+    def test_player_ev_table(self):
+        from vectorized import player_ev_table
+        table = player_ev_table([12, 21], 20000, seed=1)
+        self.assertLess(table[21][10], table[12][10], "Hitting to 21 should be worse than standing on 12 against a 10")
+
+class TestDealerOdds(unittest.TestCase):
+    def test_probabilities_sum_to_one(self):
+        from dealer_odds import dealer_probabilities, full_shoe, remove_card
+        for upcard in range(2, 12):
+            outcomes = dealer_probabilities(remove_card(full_shoe(1), upcard), upcard)
+            self.assertAlmostEqual(sum(outcomes.values()), 1.0, msg="Outcome probabilities should sum to 1")
+
+    def test_known_bust_rate_and_cache(self):
+        from dealer_odds import dealer_probabilities, full_shoe, remove_card, cache_info
+        shoe = remove_card(full_shoe(6), 6)
+        self.assertAlmostEqual(dealer_probabilities(shoe, 6)["bust"], 0.4228, places=3, msg="Host busts about 42.3% showing a 6")
+        hits = cache_info().hits
+        dealer_probabilities(shoe, 6)
+        self.assertGreater(cache_info().hits, hits, "Repeated compositions should be served from the cache")
+
+    def test_infinite_deck_table(self):
+        from dealer_odds import infinite_deck_probabilities
+        for upcard, bust in ((6, 0.4232), (10, 0.2121), (11, 0.1153)):
+            outcomes = infinite_deck_probabilities(upcard)
+            self.assertAlmostEqual(sum(outcomes.values()), 1.0, msg="Outcome probabilities should sum to 1")
+            self.assertAlmostEqual(outcomes["bust"], bust, places=4, msg="Known infinite-deck bust rate")
+        self.assertGreater(infinite_deck_probabilities(6, hits_soft_17=True)["bust"], 0.4232, "H17 should bust more often")
+
+class TestStrategy(unittest.TestCase):
+    def setUp(self):
+        from strategy import basic_strategy
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.table = basic_strategy(6, self.cache_dir.name)
+
+    def tearDown(self):
+        self.table.data.close()
+        self.cache_dir.cleanup()
+
+    def test_known_decisions(self):
+        from strategy import DOUBLE, HIT, SPLIT, STAND
+        self.assertEqual(self.table.decide(Hand([Card('♠', '6'), Card('♥', '5')]), 6, can_double=True), DOUBLE, "Double 11 against a 6")
+        self.assertEqual(self.table.decide(Hand([Card('♠', '10'), Card('♥', '6')]), 10), HIT, "Hit 16 against a 10")
+        self.assertEqual(self.table.decide(Hand([Card('♠', '10'), Card('♥', '3')]), 4), STAND, "Stand 13 against a 4")
+        self.assertEqual(self.table.decide(Hand([Card('♠', '8'), Card('♥', '8')]), 7, can_split=True), SPLIT, "Split 8s against a 7")
+
+    def test_table_is_cached_on_disk(self):
+        from strategy import basic_strategy
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 1, "Table should be saved to the cache directory")
+        cached = basic_strategy(6, self.cache_dir.name)
+        self.assertEqual(cached.data[:], self.table.data[:], "Cached table should load unchanged")
+        cached.data.close()
+
+    def test_policy_plays_full_rounds(self):
+        from simulation import BasicStrategyPolicy
+        result = simulate(["Alfredo"], 10 ** 6, 300, BasicStrategyPolicy(self.table), seed=5)
+        self.assertEqual(result.rounds, 300, "Strategy policy should play every round")
+
+class TestEventLog(unittest.TestCase):
+    def test_replay_matches_game(self):
+        from eventlog import EventLogWriter, replay
+        from simulation import BasicStrategyPolicy, HeadlessBlackjack
+        from strategy import build_strategy
+        from dealer_odds import full_shoe
+        names = ["Alfredo", "Alice"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.log")
+            with EventLogWriter(path, names, 1000, batch_size=64) as log:
+                game = HeadlessBlackjack(names, 1000, BasicStrategyPolicy(build_strategy(full_shoe(1)), 10), seed=9, event_log=log)
+                for _ in range(200):
+                    game.play_headless_round()
+
+            states = list(replay(path))
+            self.assertEqual([state.round_number for state in states], list(range(1, 201)),
+                             "Every round should be replayed into its own snapshot")
+            self.assertEqual([player.balance for player in states[-1].players],
+                             [player.balance for player in game.players], "Replayed balances should match the game")
+
+    def test_replay_with_resumed_balances(self):
+        from eventlog import EventLogWriter, replay
+        from simulation import HeadlessBlackjack
+        from store import BankrollStore
+        names = ["Alfredo", "Alice"]
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "game.log")
+            with BankrollStore(os.path.join(directory, "bankroll.db")) as store:
+                for seed in (1, 2):
+                    # The second session resumes the balances the first one left in the store
+                    with EventLogWriter(log_path, names, 1000) as log:
+                        game = HeadlessBlackjack(names, 1000, Policy(bet_amount=10), seed=seed, event_log=log, store=store)
+                        for _ in range(50):
+                            game.play_headless_round()
+                    store.flush()
+
+            states = [[player.balance for player in state.players] for state in replay(log_path)]
+            self.assertEqual(len(states), 100, "Both sessions should be replayed")
+            self.assertEqual(states[-1], [player.balance for player in game.players],
+                             "Replay should start each seat from its resumed balance")
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def test_round_over_tcp(self):
+        import asyncio
+        from server import BlackjackServer
+        server = BlackjackServer(100, action_timeout=1.0)
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"JOIN t1 Alfredo\n")
+        answers = {"BET?": "10", "SPLIT?": "no", "DOUBLE?": "no", "ACTION?": "s"}
+        while True:
+            line = (await asyncio.wait_for(reader.readline(), 5)).decode().split()
+            if line[0] == "RESULT":
+                break
+            if line[0] in answers:
+                writer.write(answers[line[0]].encode() + b"\n")
+
+        self.assertIn(int(line[1]), (90, 100, 110), "Balance should change by at most one bet")
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+
+    async def test_table_rules(self):
+        import asyncio
+        from rules import Rules, THREE_TO_TWO
+        from server import BlackjackServer
+        server = BlackjackServer(100, action_timeout=1.0, rules=Rules(blackjack_payout=THREE_TO_TWO, surrender=True))
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"JOIN t1 Alfredo\n")
+        bets = ["3", "10"]  # 3 cannot be paid exactly at 3:2, so the table asks again
+        prompts = []
+        while True:
+            line = (await asyncio.wait_for(reader.readline(), 5)).decode().split()
+            prompts.append(line[0])
+            if line[0] == "RESULT":
+                break
+            if line[0] == "BET?":
+                self.assertEqual(line[1:], ["100", "2"], "Bet prompts should carry the balance and bet unit")
+                writer.write(bets.pop(0).encode() + b"\n")
+            elif line[0] == "SURRENDER?":
+                writer.write(b"yes\n")
+
+        self.assertEqual(prompts.count("BET?"), 2, "A bet the payouts cannot settle exactly should be asked again")
+        self.assertIn("SURRENDER?", prompts, "Tables with surrender should offer it")
+        self.assertIn(int(line[1]), (90, 95), "A surrender should return half the bet unless the host has a natural")
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+
+class TestBench(unittest.TestCase):
+    def test_regression_detection(self):
+        from bench import find_regressions, run_benchmarks
+        results = run_benchmarks(["host.must_hit", "round.2_players"], iterations=200, repeat=1)
+        self.assertIn("alloc_bytes_per_round", results["round.2_players"], "Round benchmarks should report allocations")
+        baseline = {name: {"ops_per_sec": result["ops_per_sec"] * 2} for name, result in results.items()}
+        self.assertEqual(len(find_regressions(results, baseline, 0.2)), 2, "Halved throughput should be flagged")
+        self.assertEqual(find_regressions(results, results, 0.2), [], "Unchanged throughput should pass")
+
+class TestInstrumentation(unittest.TestCase):
+    def test_phases_are_recorded(self):
+        import json
+        from instrumentation import Instrumentation, PHASES
+        from simulation import HeadlessBlackjack
+        snapshots = []
+        instrumentation = Instrumentation(snapshot_every=10, on_snapshot=lambda inst: snapshots.append(inst.to_json()))
+        game = instrumentation.attach(HeadlessBlackjack(["Alfredo"], 10 ** 6, Policy(), seed=2))
+        for _ in range(50):
+            game.play_headless_round()
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot["rounds"], 50, "Every round should be counted")
+        self.assertGreater(snapshot["reshuffles"], 0, "Cut card reshuffles should be counted")
+        for phase in PHASES:
+            self.assertEqual(snapshot["phases"][phase]["calls"], 50, f"{phase} should run once per round")
+        self.assertEqual(len(snapshots), 5, "A snapshot should be exported every 10 rounds")
+        self.assertEqual(json.loads(snapshots[-1])["rounds"], 50, "Snapshots should be machine readable")
+
+        instrumentation.detach()
+        game.play_headless_round()
+        self.assertEqual(instrumentation.rounds, 50, "Detached games should not be timed")
+
+class TestBankrollStore(unittest.TestCase):
+    def test_batched_writes_and_resume(self):
+        from store import BankrollStore
+        from simulation import HeadlessBlackjack
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bankroll.db")
+            store = BankrollStore(path, batch_rounds=25)
+            game = HeadlessBlackjack(["Alfredo", "Alice"], 1000, Policy(bet_amount=10), seed=4, store=store)
+            for _ in range(30):
+                game.play_headless_round()
+            written = store.connection.execute("SELECT COUNT(*) FROM rounds").fetchone()[0]
+            self.assertEqual(written, 50, "Only complete batches should be written before closing")
+            store.close()
+
+            with BankrollStore(path) as resumed:
+                game = HeadlessBlackjack(["Alfredo", "Bob"], 1000, Policy(), store=resumed)
+                self.assertEqual(game.players[0].balance, 1000 + resumed.player_stats("Alfredo")["net"],
+                                 "Known players should resume their stored balance")
+                self.assertEqual(resumed.player_stats("Alfredo")["rounds"], 30, "Every round should be stored")
+                self.assertEqual(game.players[1].balance, 1000, "New players should start with the initial balance")
+
+class TestShoeTracker(unittest.TestCase):
+    def test_incremental_counts_match_rescan(self):
+        from tracker import ShoeTracker, HI_LO_TAGS
+        deck = Deck(3, num_decks=2)
+        deck.deal()
+        tracker = ShoeTracker().attach(deck)
+        for _ in range(40):
+            deck.hit()
+
+        dealt = deck.cards[:deck.position]
+        self.assertEqual(tracker.hi_lo, sum(HI_LO_TAGS[card.value - 2] for card in dealt), "Running count should match a rescan")
+        self.assertEqual(tracker.remaining_by_rank()["A"], 8 - sum(card.rank == "A" for card in dealt), "Ace count should match a rescan")
+        self.assertAlmostEqual(tracker.true_count, tracker.hi_lo / (62 / 52), msg="True count should use decks remaining")
+        self.assertAlmostEqual(tracker.penetration, 42 / 104, msg="Penetration should be the dealt fraction")
+
+        deck.shuffle()
+        self.assertEqual((tracker.hi_lo, tracker.ko, tracker.remaining), (0, -4, 104), "Shuffling should reset the counts")
+
+    def test_counting_bet_policy(self):
+        from simulation import CountingBetPolicy
+        result = simulate(["Alfredo"], 10 ** 6, 500, CountingBetPolicy(Policy(), bet_amount=2), seed=8)
+        stats = result.players["Alfredo"]
+        self.assertGreater(stats.wagered, 2 * stats.rounds, "Bets should be raised at positive counts")
+
+class TestCheckpoint(unittest.TestCase):
+    def test_resume_is_identical_to_uninterrupted_run(self):
+        from checkpoint import resume, simulate_checkpointed
+        from rules import Rules, THREE_TO_TWO
+        from simulation import CountingBetPolicy
+        names = ["Alfredo", "Alice"]
+        rules = Rules(blackjack_payout=THREE_TO_TWO, num_decks=2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.ckpt")
+            simulate_checkpointed(names, 1000, 300, path, CountingBetPolicy(Policy(), bet_amount=2), checkpoint_every=100,
+                                  trajectory_every=10, seed=9, rules=rules)
+            resumed = resume(path, rounds=700)
+            straight = simulate_checkpointed(names, 1000, 700, path, CountingBetPolicy(Policy(), bet_amount=2),
+                                             trajectory_every=10, seed=9, rules=rules)
+            untracked = simulate_checkpointed(names, 1000, 100, path, seed=9)
+
+        self.assertEqual(resumed.rounds, 700, "Resumed run should play up to the new total")
+        for name in names:
+            a, b = resumed.players[name], straight.players[name]
+            self.assertEqual((a.wins, a.losses, a.pushes, a.net, a.trajectory), (b.wins, b.losses, b.pushes, b.net, b.trajectory),
+                             "Resuming should continue bit-identically")
+            self.assertEqual(len(a.trajectory), 70, "The trajectory should be sampled across the resume")
+            self.assertEqual(untracked.players[name].trajectory, [], "Checkpointed runs should not keep a trajectory by default")
+
+class TestGrid(unittest.TestCase):
+    def test_only_new_cells_are_computed(self):
+        from grid import flat_bet, run_grid
+        from rules import Rules
+        from simulation import CountingBetPolicy
+        strategies = {"mimic": Policy(), "stand-12": Policy(stand_value=12)}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = run_grid({"S17": Rules()}, strategies, {"flat": flat_bet}, [1, 2], 200, workers=2, cache_dir=cache_dir)
+            second = run_grid({"S17": Rules(), "H17": Rules(host_hits_soft_17=True)}, strategies,
+                              {"flat": flat_bet, "hi-lo": CountingBetPolicy}, [1, 2], 200, workers=2, cache_dir=cache_dir)
+
+        self.assertEqual(len(second), 16, "Every combination of the axes should be a cell")
+        self.assertFalse(any(totals["cached"] for totals in first.values()), "A new grid should compute every cell")
+        self.assertEqual({cell for cell, totals in second.items() if totals["cached"]}, set(first),
+                         "Only cells added by the new axes should be computed")
+        for cell, totals in first.items():
+            self.assertEqual(second[cell]["net"], totals["net"], "Cached cells should return the stored results")
+            self.assertEqual(totals["rounds"], 200 * cell[3], "Every seat should play every round")
+
+    def test_default_bets_follow_the_table_unit(self):
+        from grid import flat_bet, run_grid
+        from rules import Rules, SIX_TO_FIVE, THREE_TO_TWO
+        from simulation import CountingBetPolicy
+        rule_sets = {"3:2": Rules(blackjack_payout=THREE_TO_TWO), "6:5": Rules(blackjack_payout=SIX_TO_FIVE, surrender=True)}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cells = run_grid(rule_sets, {"mimic": Policy()}, {"flat": flat_bet, "hi-lo": CountingBetPolicy},
+                             [1], 200, workers=1, cache_dir=cache_dir)
+        for (rules, _, bets, _), totals in cells.items():
+            self.assertEqual(totals["rounds"], 200, "Every round should be played")
+            if bets == "flat":
+                unit = 2 if rules == "3:2" else 10
+                self.assertEqual(totals["wagered"], 200 * unit, "Default flat bets should be one table bet unit")
+
+class TestRenderer(unittest.TestCase):
+    def test_buffered_rendering_writes_one_block_per_round(self):
+        import io
+        from renderer import BufferedRenderer, TerminalRenderer
+        from simulation import HeadlessBlackjack
+
+        class CountingStream(io.StringIO):
+            writes = 0
+
+            def write(self, text):
+                self.writes += 1
+                return super().write(text)
+
+        stream = CountingStream()
+        lines = []
+        buffered = HeadlessBlackjack(["Alfredo", "Alice"], 1000, Policy(), seed=8, renderer=BufferedRenderer(stream))
+        printed = HeadlessBlackjack(["Alfredo", "Alice"], 1000, Policy(), seed=8,
+                                    renderer=TerminalRenderer(lambda text, end="\n": lines.append(f"{text}{end}")))
+        for _ in range(5):
+            buffered.play_headless_round()
+            printed.play_headless_round()
+        self.assertEqual(stream.writes, 5, "Each round should be written as a single block")
+        self.assertEqual(stream.getvalue(), "".join(lines), "Buffering should not change the output")
+
+    def test_null_renderer_skips_formatting(self):
+        from unittest import mock
+        from simulation import HeadlessBlackjack
+        game = HeadlessBlackjack(["Alfredo"], 1000, Policy(), seed=8)
+        with mock.patch("player.Player.print_hand") as print_hand:
+            for _ in range(5):
+                game.play_headless_round()
+        print_hand.assert_not_called()
+
+class TestBufferReuse(unittest.TestCase):
+    def test_hands_are_reused_across_rounds(self):
+        player = Blackjack(["Alice"], 1000).players[0]
+        player.receive_hand(Card('♠', '8'), Card('♥', '8'))
+        player.split()
+        first_hand, split_hand = player.hands
+        player.reset_hand()
+        player.reset_bet()
+        self.assertIs(player.hands[0], first_hand, "The first hand should be cleared in place")
+        self.assertEqual((len(player.hands), len(first_hand), player.bets), (1, 0, [0]), "Round state should be reset")
+        player.receive_hand(Card('♠', '9'), Card('♥', '9'))
+        player.split()
+        self.assertIs(player.hands[1], split_hand, "Split hands should come from the spare pool")
+
+    def test_allocation_budget(self):
+        from instrumentation import AllocationBudget, AllocationBudgetExceeded
+        from simulation import HeadlessBlackjack
+        budget = AllocationBudget()
+        game = budget.attach(HeadlessBlackjack(["Alfredo", "Alice"], 10 ** 6, Policy(), seed=6))
+        try:
+            for _ in range(20):
+                game.play_headless_round()
+            self.assertEqual(budget.rounds, 20, "Every played round should be measured")
+            budget.max_bytes = 1
+            with self.assertRaises(AllocationBudgetExceeded):
+                game.play_headless_round()
+        finally:
+            budget.detach()
+
+    def test_allocation_budget_detach_restores_state(self):
+        import tracemalloc
+        from instrumentation import AllocationBudget, Instrumentation
+        from simulation import HeadlessBlackjack
+        instrumentation = Instrumentation()
+        game = instrumentation.attach(HeadlessBlackjack(["Alfredo"], 10 ** 6, Policy(), seed=6))
+        wrapped = (game.reset_for_new_round, game.update_balances)
+        tracemalloc.start()
+        try:
+            budget = AllocationBudget()
+            budget.attach(game)
+            budget.detach()
+            self.assertTrue(tracemalloc.is_tracing(), "Tracing started elsewhere should be left running")
+        finally:
+            tracemalloc.stop()
+        self.assertEqual((game.reset_for_new_round, game.update_balances), wrapped,
+                         "Detaching should put back the wrappers it replaced")
+        game.play_headless_round()
+        self.assertEqual(instrumentation.rounds, 1, "Instrumentation should keep measuring after the budget is detached")
+
+    def test_detaching_out_of_order(self):
+        from instrumentation import AllocationBudget, Instrumentation, PHASES
+        from simulation import HeadlessBlackjack
+        game = HeadlessBlackjack(["Alfredo"], 10 ** 6, Policy(), seed=6)
+        instrumentation = Instrumentation()
+        instrumentation.attach(game)
+        budget = AllocationBudget()
+        budget.attach(game)
+        instrumentation.detach()
+        game.play_headless_round()
+        self.assertEqual((budget.rounds, instrumentation.rounds), (1, 0),
+                         "Detaching one tool should leave the other's wrappers working")
+        budget.detach()
+        game.play_headless_round()
+        self.assertEqual((budget.rounds, instrumentation.rounds), (1, 0), "Detached tools should stay detached")
+        self.assertFalse(set(vars(game)) & set(PHASES), "Every phase should fall back to the class method")
+
+class TestRules(unittest.TestCase):
+    def test_host_soft_17(self):
+        from rules import Rules
+        soft_17 = [Card('♠', 'A'), Card('♥', '6')]
+        stand = Blackjack(["Alfredo"], 1000)
+        hit = Blackjack(["Alfredo"], 1000, rules=Rules(host_hits_soft_17=True))
+        for game in (stand, hit):
+            game.host.receive_hand(*soft_17)
+        self.assertFalse(stand.host.must_hit(), "Host should stand on soft 17 by default")
+        self.assertTrue(hit.host.must_hit(), "Host should hit soft 17 under H17 rules")
+
+    def test_blackjack_payout_and_surrender(self):
+        from rules import Rules, THREE_TO_TWO
+        game = Blackjack(["Alfredo", "Alice"], 1000, rules=Rules(blackjack_payout=THREE_TO_TWO, surrender=True))
+        game.active_players = game.players
+        alfredo, alice = game.players
+        for player in game.players:
+            player.place_bet(100)
+        alfredo.receive_hand(Card('♠', 'A'), Card('♥', 'K'))
+        alice.receive_hand(Card('♠', '10'), Card('♥', '6'))
+        alice.surrender()
+        game.host.receive_hand(Card('♠', '10'), Card('♥', '9'))
+        game.update_balances()
+        self.assertEqual(alfredo.balance, 1150, "A natural should pay 3:2")
+        self.assertEqual(alice.balance, 950, "Surrender should return half the bet")
+
+    def test_late_surrender_loses_to_host_natural(self):
+        import numpy as np
+        from rules import LOSS, SURRENDER, Rules, THREE_TO_TWO
+        from vectorized import hand_outcomes
+        for rules in (Rules(surrender=True), Rules(blackjack_payout=THREE_TO_TWO, surrender=True)):
+            game = Blackjack(["Alfredo"], 1000, rules=rules)
+            game.active_players = game.players
+            alfredo = game.players[0]
+            alfredo.place_bet(100)
+            alfredo.receive_hand(Card('♠', '10'), Card('♥', '6'))
+            alfredo.surrender()
+            game.host.receive_hand(Card('♠', 'A'), Card('♥', 'K'))
+            game.update_balances()
+            self.assertEqual(alfredo.balance, 900, f"A surrender should lose the whole bet to a host natural under {rules}")
+
+        outcomes = hand_outcomes(np.array([16, 16]), np.array([21, 21]), host_naturals=np.array([True, False]),
+                                 surrendered=np.array([True, True]))
+        self.assertEqual(outcomes.tolist(), [LOSS, SURRENDER])
+
+    def test_payout_syntax(self):
+        from rules import parse_payout
+        self.assertEqual([parse_payout(text) for text in ("3:2", "6/5", "1.5")], [(3, 2), (6, 5), (3, 2)])
+
+    def test_session_to_ruin_at_three_to_two(self):
+        from analytics import analyze
+        from rules import Rules, THREE_TO_TWO
+        from simulation import CountingBetPolicy
+        # Naturals leave odd balances, so capped bets near ruin are off-unit until the table rounds them down
+        policies = {"flat": Policy(bet_amount=4), "hi-lo": CountingBetPolicy(Policy(), bet_amount=2)}
+        results = analyze(policies, 41, sessions=40, max_rounds=2000, seed=1, workers=1,
+                          rules=Rules(blackjack_payout=THREE_TO_TWO))
+        for name, stats in results.items():
+            self.assertGreater(stats.ruined, 0, f"{name} sessions should play on until ruin")
+            self.assertGreaterEqual(stats.final_balance.min, 0)
+
+    def test_smallest_bets_are_paid_exactly(self):
+        from rules import CompiledRules, Rules, SIX_TO_FIVE, THREE_TO_TWO
+        from simulation import HeadlessBlackjack
+        rules = CompiledRules(Rules(blackjack_payout=THREE_TO_TWO, surrender=True))
+        self.assertEqual(rules.bet_unit, 2)
+        self.assertEqual(CompiledRules(Rules(blackjack_payout=SIX_TO_FIVE)).bet_unit, 5)
+        self.assertEqual(CompiledRules(Rules()).bet_unit, 1, "Even-money tables should take any bet")
+        with self.assertRaises(ValueError, msg="A 1-unit bet at 3:2 cannot be paid exactly"):
+            rules.table_bet(1, 1000)
+        self.assertEqual(rules.table_bet(2, 1), 0, "A balance below the bet unit should sit the round out")
+        self.assertEqual(rules.table_bet(7, 7), 6, "A capped bet of an odd balance should round down to whole units")
+
+        game = Blackjack(["Alfredo", "Alice"], 1000, rules=Rules(blackjack_payout=THREE_TO_TWO, surrender=True))
+        game.active_players = game.players
+        alfredo, alice = game.players
+        for player in game.players:
+            player.place_bet(2)
+        alfredo.receive_hand(Card('♠', 'A'), Card('♥', 'K'))
+        alice.receive_hand(Card('♠', '10'), Card('♥', '6'))
+        alice.surrender()
+        game.host.receive_hand(Card('♠', '10'), Card('♥', '9'))
+        game.update_balances()
+        self.assertEqual(alfredo.balance, 1003, "A 2-unit natural should win 3")
+        self.assertEqual(alice.balance, 999, "Surrendering 2 units should refund 1")
+
+        with self.assertRaises(ValueError):
+            HeadlessBlackjack(["Alfredo"], 1000, Policy(bet_amount=1), seed=1,
+                              rules=Rules(blackjack_payout=THREE_TO_TWO)).play_headless_round()
+
+    def test_resplit_and_double_after_split(self):
+        from rules import Rules
+        from simulation import HeadlessBlackjack
+
+        class SplitAndDouble(Policy):
+            def split(self, game, player, hand_index=0):
+                return True
+
+            def double_down(self, game, player, hand_index=0):
+                return len(player.hands) > 1
+
+        game = HeadlessBlackjack(["Alfredo"], 10 ** 6, SplitAndDouble(), seed=1,
+                                 rules=Rules(double_after_split=True, max_hands=4))
+        player = game.players[0]
+        most_hands = doubled = 0
+        for _ in range(300):
+            game.play_headless_round()
+            most_hands = max(most_hands, len(player.hands))
+            self.assertLessEqual(len(player.hands), 4, "Resplits should stop at max_hands")
+            if len(player.hands) > 1:
+                doubled += player.bets.count(2)
+                self.assertTrue(all(len(hand) <= 3 for hand in player.hands), "Split hands should double on their second card")
+        self.assertGreater(most_hands, 2, "Pairs on split hands should be resplit")
+        self.assertGreater(doubled, 0, "Split hands should be doubled")
+
+class TestBatchPolicy(unittest.TestCase):
+    def test_one_call_per_decision_point(self):
+        from batch import BatchBlackjack, BatchPolicy, play_batched_round
+        from rules import Rules
+
+        class CountingBatchPolicy(BatchPolicy):
+            def __init__(self):
+                super().__init__(Policy())
+                self.calls = []
+
+            def bets(self, seats):
+                self.calls.append(("bets", {game for game, _, _ in seats}))
+                return super().bets(seats)
+
+            def actions(self, seats):
+                self.calls.append(("actions", {game for game, _, _ in seats}))
+                return super().actions(seats)
+
+        policy = CountingBatchPolicy()
+        tables = [BatchBlackjack([f"Seat {seat}" for seat in range(5)], 10 ** 6, policy, seed=seed,
+                                 rules=Rules(double_after_split=True, max_hands=4)) for seed in (1, 2)]
+        for _ in range(50):
+            policy.calls.clear()
+            outcomes = play_batched_round(tables, policy)
+            self.assertEqual(policy.calls[0], ("bets", set(tables)), "Bets for every table should be one call")
+            self.assertEqual(sum(name == "bets" for name, _ in policy.calls), 1)
+            for outcome, table in zip(outcomes, tables):
+                self.assertEqual(len(outcome), 5, "Every seat should play")
+                for player, (_, net) in outcome.items():
+                    self.assertEqual(net, player.balance - table.round_start_balances[player], "Every hand should be settled")
+        self.assertIn(("actions", set(tables)), policy.calls, "Hit/stand decisions should span both tables")
+
+        # The default batch policy plays the same decisions as the per-seat policy it wraps
+        single = BatchBlackjack(["Alfredo"], 1000, BatchPolicy(Policy(stand_value=15)), seed=3)
+        for _ in range(20):
+            wagered, net = single.play_headless_round()[single.players[0]]
+            self.assertEqual(wagered, 1)
+            self.assertIn(net, (-1, 0, 1))
+
+class TestAnalytics(unittest.TestCase):
+    def test_online_estimators_match_full_data(self):
+        import random
+        import statistics
+        from analytics import RunningMoments
+        values = [random.Random(index).gauss(0, 3) for index in range(1000)]
+        whole, first, second = RunningMoments(), RunningMoments(), RunningMoments()
+        for index, value in enumerate(values):
+            whole.add(value)
+            (first if index < 400 else second).add(value)
+        first.merge(second)
+        for moments in (whole, first):
+            self.assertAlmostEqual(moments.mean, statistics.mean(values))
+            self.assertAlmostEqual(moments.variance, statistics.variance(values))
+            self.assertEqual((moments.min, moments.max), (min(values), max(values)))
+
+    def test_risk_of_ruin(self):
+        from analytics import analyze
+        policies = {"small": Policy(), "large": Policy(bet_amount=5)}
+        serial = analyze(policies, 20, sessions=60, max_rounds=300, seed=3, workers=1, shard_sessions=20)
+        pooled = analyze(policies, 20, sessions=60, max_rounds=300, seed=3, workers=2, shard_sessions=20)
+        for name, stats in serial.items():
+            self.assertEqual(stats.sessions, 60)
+            self.assertEqual(sum(count for _, _, count in stats.ruin_distribution()), stats.ruined)
+            self.assertEqual(stats.ruin_by(511), stats.risk_of_ruin, "Every ruin should happen within max_rounds")
+            self.assertGreaterEqual(stats.final_balance.min, 0)
+            self.assertEqual((pooled[name].ruined, pooled[name].round_net.count), (stats.ruined, stats.round_net.count),
+                             "Results should not depend on the number of workers")
+        self.assertGreater(serial["large"].risk_of_ruin, serial["small"].risk_of_ruin, "Bigger bets should ruin more often")
+
+class TestCLI(unittest.TestCase):
+    def test_config_file_and_flags(self):
+        import contextlib
+        import io
+        import json
+        from main import cli
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "job.json")
+            with open(path, "w") as file:
+                json.dump({"players": ["Ann", "Bob"], "rounds": 500, "seed": 7, "blackjack_payout": "3:2"}, file)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(cli(["--config", path, "simulate", "--rounds", "300", "--json"]), 0)
+
+        result = json.loads(output.getvalue())
+        self.assertEqual(result["rounds"], 300, "Flags should override the config file")
+        self.assertEqual(set(result["players"]), {"Ann", "Bob"}, "Seats should come from the config file")
+
+    def test_prompted_play_keeps_table_flags(self):
+        import contextlib
+        import io
+        from unittest import mock
+        from eventlog import TABLE, read_events
+        from main import cli
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.log")
+            with mock.patch("builtins.input", side_effect=["x", "1", "Ann", "100"]), \
+                    mock.patch("blackjack.Blackjack") as table, contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(cli(["play", "--h17", "--surrender", "--log", path]), 0)
+            self.assertEqual(next(read_events(path)), (TABLE, (100, ["Ann"])), "Prompted names and balance should be logged")
+
+        names, balance = table.call_args.args
+        rules = table.call_args.kwargs["rules"]
+        self.assertEqual((names, balance), (["Ann"], 100))
+        self.assertTrue(rules.host_hits_soft_17 and rules.surrender, "Rule flags should apply to prompted games")
+
+    def test_conflicting_options_are_rejected(self):
+        import contextlib
+        import io
+        from main import parse_args
+        for argv in (["simulate", "--infinite-deck", "--workers", "2"],
+                     ["simulate", "--infinite-deck", "--checkpoint", "run.ckpt"],
+                     ["simulate", "--workers", "0", "--checkpoint", "run.ckpt"],
+                     ["simulate", "--strategy", "basic", "--h17"],
+                     ["play", "--hints", "--das", "--surrender"]):
+            with self.assertRaises(SystemExit, msg=f"{argv} should be rejected"), contextlib.redirect_stderr(io.StringIO()):
+                parse_args(argv)
+        self.assertTrue(parse_args(["simulate", "--infinite-deck", "--strategy", "basic"]).infinite_deck)
+
+    def test_startup_loads_only_what_a_command_needs(self):
+        import subprocess
+        import sys
+        script = ("import sys; from main import parse_args; parse_args(['simulate']); "
+                  "print(sorted(name for name in ('blackjack', 'numpy', 'sqlite3', 'asyncio', 'concurrent.futures') if name in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(output.strip(), "[]", "Parsing the command line should not import any game or optional module")
+
+class TestConformance(unittest.TestCase):
+    def test_engines_match_reference(self):
+        from conformance import run_checks
+        for name, (passed, _, detail) in run_checks(scale=0.1, seed=1).items():
+            self.assertTrue(passed, f"{name}: {detail}")
+
+    def test_harness_detects_broken_engines(self):
+        import random
+        from unittest import mock
+        from conformance import check_hand_values, check_shuffle_uniformity
+
+        def append_without_soft_aces(hand, card):
+            hand.cards.append(card)
+            hand.value += card.value  # Aces always count as 11
+
+        with mock.patch.object(Hand, "append", append_without_soft_aces):
+            with self.assertRaises(AssertionError, msg="Hard-counted Aces should fail the hand value check"):
+                check_hand_values(random.Random(0), max_cards=3)
+
+        def biased_shuffle(deck):
+            deck.rng.shuffle(deck.cards)
+            deck.position = 0
+            deck.cards.sort(key=lambda card: card.rank == "A")  # Aces always sink to the bottom
+
+        with mock.patch.object(Deck, "shuffle", biased_shuffle):
+            with self.assertRaises(AssertionError, msg="A biased shuffle should fail the chi-square check"):
+                check_shuffle_uniformity(random.Random(0), 1000)
+
 # Start tests
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
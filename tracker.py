@@ -0,0 +1,74 @@
+from dealer_odds import CARD_VALUES
+from deck import CARDS, RANKS
+
+# Count tags by card value (index 0 is a 2, index 9 is an Ace)
+HI_LO_TAGS = (1, 1, 1, 1, 1, 0, 0, 0, -1, -1)
+KO_TAGS = (1, 1, 1, 1, 1, 1, 0, 0, -1, -1)
+CARDS_PER_DECK = len(CARDS)
+
+
+class ShoeTracker:
+    # Running Hi-Lo and KO counts, remaining cards by rank and value, and penetration.
+    # The deck reports every dealt card and every shuffle, so each update is O(1).
+    def __init__(self):
+        self.deck = None
+        self.num_decks = 1
+        self.total_cards = CARDS_PER_DECK
+        self.reset()
+
+    def attach(self, deck):
+        # Start tracking a deck, counting any cards it has already dealt
+        self.deck = deck
+        self.num_decks = deck.num_decks
+        self.total_cards = len(deck.cards)
+        self.reset()
+        for card in deck.cards[:deck.position]:
+            self.card_dealt(card)
+        deck.tracker = self
+        return self
+
+    def detach(self):
+        if self.deck is not None:
+            self.deck.tracker = None
+            self.deck = None
+
+    def reset(self):
+        # Called whenever the shoe is reshuffled
+        self.dealt = 0
+        self.hi_lo = 0
+        self.ko = 4 - 4 * self.num_decks  # KO starts from its standard initial running count
+        self.rank_counts = [4 * self.num_decks] * len(RANKS)
+        self.value_counts = [count * self.num_decks for count in (4, 4, 4, 4, 4, 4, 4, 4, 16, 4)]
+
+    def card_dealt(self, card):
+        index = card.value - CARD_VALUES[0]
+        self.dealt += 1
+        self.hi_lo += HI_LO_TAGS[index]
+        self.ko += KO_TAGS[index]
+        self.rank_counts[card.code % len(RANKS)] -= 1
+        self.value_counts[index] -= 1
+
+    @property
+    def remaining(self):
+        return self.total_cards - self.dealt
+
+    @property
+    def decks_remaining(self):
+        return self.remaining / CARDS_PER_DECK
+
+    @property
+    def true_count(self):
+        # Hi-Lo running count per deck left in the shoe
+        decks = self.decks_remaining
+        return self.hi_lo / decks if decks else 0.0
+
+    @property
+    def penetration(self):
+        return self.dealt / self.total_cards
+
+    def remaining_by_rank(self):
+        return dict(zip(RANKS, self.rank_counts))
+
+    def composition(self):
+        # Remaining cards by value, in the format used by dealer_odds and strategy
+        return tuple(self.value_counts)
@@ -0,0 +1,204 @@
+from functools import lru_cache
+
+import numpy as np
+
+from dealer_odds import CARD_VALUES, DEALER_OUTCOMES, HOST_OUTCOME_TOTALS, HOST_OUTCOMES, NATURAL, infinite_deck_table
+from deck import ACE_VALUE, CARDS
+from hand import BLACKJACK_VALUE, SOFT_ACE_ADJUSTMENT
+from host import HOST_STAND_VALUE
+from rules import BLACKJACK, LOSS, PUSH, SURRENDER, WIN
+
+# Constants
+DEFAULT_HANDS = 100000
+UPCARDS = list(CARD_VALUES)  # Ten-valued cards share the upcard 10, Aces are 11
+STAND_VALUES = list(range(12, BLACKJACK_VALUE + 1))  # Fixed "hit below N" player strategies
+HOST_TOTALS = np.array(HOST_OUTCOME_TOTALS, dtype=np.int16)
+
+
+def shoe_values(num_decks=1):
+    # Blackjack values of every card in an unshuffled shoe
+    return np.array([card.value for card in CARDS] * num_decks, dtype=np.int8)
+
+
+class VectorizedShoes:
+    # One independently shuffled shoe per hand, each with its own dealing position
+    def __init__(self, num_hands, num_decks=1, seed=None):
+        rng = np.random.default_rng(seed)
+        self.cards = rng.permuted(np.tile(shoe_values(num_decks), (num_hands, 1)), axis=1)
+        self.rows = np.arange(num_hands)
+        self.position = np.zeros(num_hands, dtype=np.int16)
+
+    def reset(self):
+        # Deal the same shoes again from the top
+        self.position[:] = 0
+
+    def draw(self, mask=None):
+        # Next card value of every shoe; shoes outside the mask draw nothing (value 0)
+        values = self.cards[self.rows, self.position].astype(np.int16)
+        if mask is None:
+            self.position += 1
+            return values
+        self.position += mask
+        return values * mask
+
+
+def add_cards(totals, soft_aces, values):
+    # Add one card to every hand in lockstep, turning a soft Ace into 1 when the hand would bust
+    totals += values
+    soft_aces += values == ACE_VALUE
+    for _ in range(2):  # An Ace drawn to a soft 21 needs both Aces counted as 1
+        adjust = (totals > BLACKJACK_VALUE) & (soft_aces > 0)
+        totals -= adjust * SOFT_ACE_ADJUSTMENT
+        soft_aces -= adjust
+
+
+def deal_hands(shoes, num_hands):
+    totals = np.zeros(num_hands, dtype=np.int16)
+    soft_aces = np.zeros(num_hands, dtype=np.int16)
+    first_card = shoes.draw()
+    add_cards(totals, soft_aces, first_card)
+    add_cards(totals, soft_aces, shoes.draw())
+    return totals, soft_aces, first_card
+
+
+def play_until(shoes, totals, soft_aces, stand_value):
+    # Keep drawing for every hand below stand_value, like Host.must_hit
+    active = totals < stand_value
+    while active.any():
+        add_cards(totals, soft_aces, shoes.draw(active))
+        active = totals < stand_value
+
+
+def outcome_indices(totals):
+    # Map final dealer totals to positions in DEALER_OUTCOMES (busts share the last slot)
+    return np.minimum(totals, BLACKJACK_VALUE + 1) - HOST_STAND_VALUE
+
+
+def dealer_outcomes(num_hands=DEFAULT_HANDS, num_decks=1, seed=None):
+    # Monte Carlo distribution of the host's final total for each upcard:
+    # {upcard: {17: p, ..., 21: p, "bust": p}}
+    shoes = VectorizedShoes(num_hands, num_decks, seed)
+    totals, soft_aces, upcards = deal_hands(shoes, num_hands)
+    play_until(shoes, totals, soft_aces, HOST_STAND_VALUE)
+
+    cells = (upcards - UPCARDS[0]) * len(DEALER_OUTCOMES) + outcome_indices(totals)
+    counts = np.bincount(cells, minlength=len(UPCARDS) * len(DEALER_OUTCOMES))
+    counts = counts.reshape(len(UPCARDS), len(DEALER_OUTCOMES))
+    probabilities = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+
+    return {
+        upcard: dict(zip(DEALER_OUTCOMES, row.tolist()))
+        for upcard, row in zip(UPCARDS, probabilities)
+    }
+
+
+def alias_table(row):
+    # Walker/Vose alias table: sampling needs one uniform outcome, one uniform draw and one comparison
+    count = len(row)
+    scaled = [probability * count for probability in row]
+    threshold = [1.0] * count
+    alias = list(range(count))
+    small = [index for index, value in enumerate(scaled) if value < 1.0]
+    large = [index for index, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        low, high = small.pop(), large.pop()
+        threshold[low] = scaled[low]
+        alias[low] = high
+        scaled[high] -= 1.0 - scaled[low]
+        (small if scaled[high] < 1.0 else large).append(high)
+    return threshold, alias
+
+
+@lru_cache(maxsize=None)
+def host_alias_tables(hits_soft_17=False):
+    # One alias table per upcard over HOST_OUTCOMES, as (threshold, alias) arrays indexed by upcard - 2
+    table = infinite_deck_table(hits_soft_17)
+    rows = [alias_table(table[upcard]) for upcard in UPCARDS]
+    return np.array([threshold for threshold, _ in rows]), np.array([alias for _, alias in rows])
+
+
+def sample_host_outcomes(upcards, rng, hits_soft_17=False):
+    # Final host totals (busts as 22) and natural flags for an array of upcards, drawn from the
+    # exact infinite-deck table instead of dealing the host's cards
+    thresholds, aliases = host_alias_tables(hits_soft_17)
+    rows = upcards - UPCARDS[0]
+    columns = rng.integers(0, len(HOST_OUTCOMES), len(upcards))
+    outcomes = np.where(rng.random(len(upcards)) < thresholds[rows, columns], columns, aliases[rows, columns])
+    totals = HOST_TOTALS[outcomes]
+    return totals, outcomes == HOST_OUTCOMES.index(NATURAL)
+
+
+def hand_outcomes(player_totals, host_totals, naturals=None, host_naturals=None, surrendered=None):
+    # Outcome code of every hand (see rules), the array form of CompiledRules.outcome.
+    # Leave out naturals for tables that settle two-card 21s like any other 21, and host_naturals
+    # unless the table pays naturals or offers surrender (a surrender loses to a host natural).
+    player_bust = player_totals > BLACKJACK_VALUE
+    host_bust = host_totals > BLACKJACK_VALUE
+    outcomes = np.full(player_totals.shape, PUSH, dtype=np.int8)
+    outcomes[~player_bust & (host_bust | (player_totals > host_totals))] = WIN
+    outcomes[player_bust | (~host_bust & (player_totals < host_totals))] = LOSS
+    if naturals is not None:
+        outcomes[naturals & host_naturals] = PUSH
+        outcomes[naturals & ~host_naturals] = BLACKJACK
+        outcomes[~naturals & host_naturals & ~player_bust] = LOSS
+    if surrendered is not None:
+        outcomes[surrendered] = SURRENDER
+        if host_naturals is not None:
+            outcomes[surrendered & host_naturals] = LOSS
+    return outcomes
+
+
+def settle_hands(rules, bets, player_totals, host_totals, naturals=None, host_naturals=None, surrendered=None):
+    # Amount returned for every hand in one pass, using the compiled payout table.
+    # Like CompiledRules.table_bet, bets must be whole bet units so every payout is exact.
+    if np.any(bets % rules.bet_unit):
+        raise ValueError(f"Bets must be multiples of {rules.bet_unit}, the smallest bet these rules pay exactly")
+    numerators, denominators = np.array(rules.payouts, dtype=np.int64).T
+    outcomes = hand_outcomes(player_totals, host_totals, naturals, host_naturals, surrendered)
+    return bets * numerators[outcomes] // denominators[outcomes]
+
+
+def balance_deltas(rules, seats, num_seats, bets, player_totals, host_totals,
+                   naturals=None, host_naturals=None, surrendered=None):
+    # Net balance change per seat for a batch of hands from any number of rounds and tables.
+    # seats maps every hand to its seat, so split hands are summed into their player.
+    payouts = settle_hands(rules, bets, player_totals, host_totals, naturals, host_naturals, surrendered)
+    deltas = np.zeros(num_seats, dtype=np.int64)
+    np.add.at(deltas, seats, payouts - bets)  # Integer sums, exact for any bet size
+    return deltas
+
+
+def settle(player_totals, host_totals):
+    # Net result per unit bet with the game's even-money payouts: bust loses, then higher total wins
+    player_bust = player_totals > BLACKJACK_VALUE
+    host_bust = host_totals > BLACKJACK_VALUE
+    wins = ~player_bust & (host_bust | (player_totals > host_totals))
+    losses = player_bust | (~host_bust & (player_totals < host_totals))
+    return wins.astype(np.int8) - losses.astype(np.int8)
+
+
+def player_ev_table(stand_values=STAND_VALUES, num_hands=DEFAULT_HANDS, num_decks=1, seed=None):
+    # EV per unit bet of "hit below N" strategies for each host upcard: {N: {upcard: ev}}.
+    # Every strategy plays the same shoes, so differences between rows have low variance.
+    shoes = VectorizedShoes(num_hands, num_decks, seed)
+    table = {}
+    for stand_value in stand_values:
+        shoes.reset()
+        # Cards come out in table order: the player's two cards, then the host's two
+        player_totals, player_soft, _ = deal_hands(shoes, num_hands)
+        host_totals, host_soft, upcards = deal_hands(shoes, num_hands)
+        play_until(shoes, player_totals, player_soft, stand_value)
+        play_until(shoes, host_totals, host_soft, HOST_STAND_VALUE)
+
+        groups = upcards - UPCARDS[0]
+        results = settle(player_totals, host_totals)
+        net = np.bincount(groups, weights=results, minlength=len(UPCARDS))
+        hands = np.maximum(np.bincount(groups, minlength=len(UPCARDS)), 1)
+        table[stand_value] = dict(zip(UPCARDS, (net / hands).tolist()))
+
+    return table
+
+
+if __name__ == "__main__":
+    for upcard, outcomes in dealer_outcomes(seed=1).items():
+        print(upcard, " ".join(f"{outcome}: {probability:.4f}" for outcome, probability in outcomes.items()))